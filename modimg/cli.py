@@ -1,18 +1,20 @@
 from __future__ import annotations
 
 import argparse
-import json
+import heapq
+import multiprocessing
 import os
-from typing import Any, Dict, List
+import sys
+from functools import lru_cache, partial
+from operator import itemgetter
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
 
-from .pipeline import run_on_input
-from .utils import is_image_file, is_url
+from .utils import is_image_file, is_url, json_dumps
 from .config import load_dotenv_candidates
 
 
-def _env_int(name: str, default: int) -> int:
-    """Parse integer env vars defensively to avoid CLI crashes on bad values."""
-    raw = os.getenv(name)
+def _int_or(raw: Optional[str], default: int) -> int:
+    """int(raw), or ``default`` if unset or not an integer (bad values must not crash the CLI)."""
     if raw is None:
         return default
     try:
@@ -20,6 +22,59 @@ def _env_int(name: str, default: int) -> int:
     except Exception:
         return default
 
+
+@lru_cache(maxsize=None)
+def _env_int(name: str, default: int) -> int:
+    """Parse integer env vars defensively to avoid CLI crashes on bad values.
+
+    Cached per process; call ``_env_int.cache_clear()`` after changing the env.
+    """
+    return _int_or(os.getenv(name), default)
+
+
+def _try_float(v: Any) -> Optional[float]:
+    """float(v), or None if the value is not numeric."""
+    try:
+        return float(v)
+    except Exception:
+        return None
+
+
+def _coerce(scores: Dict[str, Any], keys: Optional[Iterable[str]] = None) -> Iterator[tuple[str, float]]:
+    """Yield (key, float) pairs, skipping non-numeric values (and missing keys when ``keys`` is given)."""
+    src = ((k, scores[k]) for k in keys if k in scores) if keys is not None else scores.items()
+    return ((k, f) for k, v in src if (f := _try_float(v)) is not None)
+
+
+# Compact Sightengine output: the keys verdict.py actually looks at.
+_SIGHTENGINE_PREFERRED: tuple[str, ...] = (
+    "nudity_safe", "nudity_raw", "nudity_partial",
+    "weapon_firearm", "weapon_firearm_toy", "weapon_knife",
+    "gore_prob", "violence_prob", "offensive_max",
+)
+
+
+class _ScoreConfig(NamedTuple):
+    verbose: bool
+    sightengine_mode: str
+    sightengine_keys: tuple[str, ...]
+    max_keys: int
+    sightengine_extra_topk: int
+
+
+@lru_cache(maxsize=1)
+def _score_config() -> _ScoreConfig:
+    """Score-printing settings, read once per process (call .cache_clear() after changing env)."""
+    raw_keys = os.getenv("SIGHTENGINE_SCORE_KEYS", "") or ""
+    return _ScoreConfig(
+        verbose=os.getenv("SCORE_VERBOSE", "0").strip() == "1",
+        sightengine_mode=(os.getenv("SIGHTENGINE_SCORE_MODE", "compact") or "compact").strip().lower(),
+        sightengine_keys=tuple(k for k in (p.strip() for p in raw_keys.split(",")) if k),
+        # read directly, not via _env_int: its own cache would survive _score_config.cache_clear()
+        max_keys=_int_or(os.getenv("SCORE_MAX_KEYS"), 8),
+        sightengine_extra_topk=_int_or(os.getenv("SIGHTENGINE_EXTRA_TOPK"), 0),
+    )
+
 def _select_scores(engine_name: str, scores: Dict[str, Any]) -> List[tuple[str, float]]:
     """
     Reduce noisy score output.
@@ -31,133 +86,141 @@ def _select_scores(engine_name: str, scores: Dict[str, Any]) -> List[tuple[str,
       - SIGHTENGINE_SCORE_KEYS=...     -> comma-separated keys when mode=keys
       - SIGHTENGINE_EXTRA_TOPK=0       -> add strongest remaining keys (compact mode)
     """
+    if not scores:
+        return []
+    cfg = _score_config()
+
     # Global override: show everything
-    if os.getenv("SCORE_VERBOSE", "0").strip() == "1":
-        items: List[tuple[str, float]] = []
-        for k, v in scores.items():
-            try:
-                items.append((k, float(v)))
-            except Exception:
-                continue
-        return items
+    if cfg.verbose:
+        return list(_coerce(scores))
 
     name = (engine_name or "").lower()
 
     # Special handling for Sightengine (very verbose by default)
     if "sightengine" in name:
-        mode = (os.getenv("SIGHTENGINE_SCORE_MODE", "compact") or "compact").strip().lower()
+        mode = cfg.sightengine_mode
 
         if mode in ("full", "all", "verbose"):
-            items: List[tuple[str, float]] = []
-            for k, v in scores.items():
-                try:
-                    items.append((k, float(v)))
-                except Exception:
-                    continue
-            return items
+            return list(_coerce(scores))
 
         if mode == "keys":
-            keys_raw = os.getenv("SIGHTENGINE_SCORE_KEYS", "") or ""
-            wanted = [k.strip() for k in keys_raw.split(",") if k.strip()]
-            items: List[tuple[str, float]] = []
-            for k in wanted:
-                if k in scores:
-                    try:
-                        items.append((k, float(scores[k])))
-                    except Exception:
-                        pass
-            return items
+            return list(_coerce(scores, cfg.sightengine_keys))
 
         # compact (default)
-        preferred = [
-            "nudity_safe", "nudity_raw", "nudity_partial",
-            "weapon_firearm", "weapon_firearm_toy", "weapon_knife",
-            "gore_prob", "violence_prob", "offensive_max",
-        ]
-        items: List[tuple[str, float]] = []
-        for k in preferred:
-            if k in scores:
-                try:
-                    items.append((k, float(scores[k])))
-                except Exception:
-                    pass
+        items = list(_coerce(scores, _SIGHTENGINE_PREFERRED))
 
         # optionally include strongest remaining signals above a tiny threshold
-        extra_topk = _env_int("SIGHTENGINE_EXTRA_TOPK", 0)
+        extra_topk = cfg.sightengine_extra_topk
         if extra_topk > 0:
-            rest: List[tuple[str, float]] = []
-            for k, v in scores.items():
-                if k in preferred:
-                    continue
-                try:
-                    rest.append((k, float(v)))
-                except Exception:
-                    continue
-            rest.sort(key=lambda kv: kv[1], reverse=True)
-            for k, v in rest[:extra_topk]:
+            candidates = ((k, f) for k, f in _coerce(scores) if k not in _SIGHTENGINE_PREFERRED)
+            for k, v in heapq.nlargest(extra_topk, candidates, key=itemgetter(1)):
                 if v >= 0.05:  # avoid spam from zeros
                     items.append((k, v))
 
         return items
 
     # Other engines: keep up to SCORE_MAX_KEYS (default 8), highest first.
-    max_keys = _env_int("SCORE_MAX_KEYS", 8)
-    rest: List[tuple[str, float]] = []
-    for k, v in scores.items():
-        try:
-            rest.append((k, float(v)))
-        except Exception:
-            continue
-    rest.sort(key=lambda kv: kv[1], reverse=True)
-    return rest[:max_keys]
-
-
-def _iter_paths(p: str, recursive: bool) -> List[str]:
+    # heapq.nlargest keeps a bounded heap instead of sorting every key.
+    return heapq.nlargest(cfg.max_keys, _coerce(scores), key=itemgetter(1))
+
+def _scan_dir(d: str, recursive: bool) -> Iterator[str]:
+    """Yield image files below ``d`` in the same order as sorting all full paths.
+
+    Subdirectories sort under ``name + os.sep`` so ``a.png`` still comes before
+    ``a/x.png``; symlinked directories are not followed (like ``os.walk``).
+    """
+    with os.scandir(d) as it:
+        entries = sorted(it, key=lambda e: e.name + os.sep if e.is_dir(follow_symlinks=False) else e.name)
+    for e in entries:
+        if e.is_dir(follow_symlinks=False):
+            if recursive:
+                try:
+                    yield from _scan_dir(e.path, recursive)
+                except OSError:
+                    # unreadable subdirectory: skip it, as os.walk does
+                    continue
+        elif is_image_file(e.name) and e.is_file():
+            yield e.path
+
+def _iter_paths(p: str, recursive: bool) -> Iterator[str]:
     if is_url(p):
-        return [p]
+        return iter([p])
     if os.path.isdir(p):
-        out = []
-        if recursive:
-            for root, _, files in os.walk(p):
-                for f in files:
-                    fp = os.path.join(root, f)
-                    if is_image_file(fp):
-                        out.append(fp)
-        else:
-            for f in os.listdir(p):
-                fp = os.path.join(p, f)
-                if os.path.isfile(fp) and is_image_file(fp):
-                    out.append(fp)
-        return sorted(out)
-    return [p]
+        return _scan_dir(p, recursive)
+    return iter([p])
+
+def _process_one(p: str, no_apis: bool, sample_frames: int) -> Dict[str, Any]:
+    from .pipeline import run_on_input
+    return run_on_input(p, no_apis=no_apis, sample_frames=sample_frames)
+
+def _warm_engines(pool_workers: int = 1) -> None:
+    """Pool initializer: load the NudeNet detector and OCR blocklist once per worker."""
+    try:
+        # The engine threads of all workers share the CPUs.
+        from .pipeline import set_engine_processes
+        set_engine_processes(pool_workers)
+    except Exception:
+        pass
+    try:
+        # Workers only append to the shared OpenAI cache log; compacting it here would
+        # drop the lines other workers appended. main() compacts once after the join.
+        from .engines.openai_mod import OpenAIModerationEngine
+        OpenAIModerationEngine._COMPACT_IN_PROCESS = False
+    except Exception:
+        pass
+    try:
+        from .engines.nudenet_engine import NudeNetEngine
+        eng = NudeNetEngine()
+        if eng.available()[0] and NudeNetEngine._DETECTOR is None:
+            from nudenet import NudeDetector
+            NudeNetEngine._DETECTOR = NudeDetector()
+    except Exception:
+        pass
+    try:
+        from .engines.ocr import OCREngine
+        OCREngine()._load_patterns()
+    except Exception:
+        pass
+
+def _compact_openai_cache() -> None:
+    try:
+        from .engines.openai_mod import OpenAIModerationEngine
+        OpenAIModerationEngine()._compact_shared_log()
+    except Exception:
+        pass
+
+_HDR = "=" * 70 + "\n"
+_FINAL_LINE = "FINAL: {}  (verdict={}) | nudity={:.2f} violence={:.2f} hate={:.2f}\n".format
+_REASON_LINE = " - {}\n".format
+_RESULT_LINE = "   [{:<7}] {:<22} ({}ms) {}\n".format
+_SCORE_PART = "{}={:.2f}".format
+_STATUS_TAGS = {"ok": "ok", "skipped": "skipped", "error": "error"}
 
 def _print_report(rep: Dict[str, Any]) -> None:
     v = rep["verdict"]
     results = rep["results"]
     name = rep["name"]
 
-    print("="*70)
-    print(name)
-    print(f"FINAL: {'OK' if v.label=='OK' else 'NOT_OK'}  (verdict={v.label}) | nudity={v.nudity_risk:.2f} violence={v.violence_risk:.2f} hate={v.hate_risk:.2f}")
-    for r in v.reasons:
-        print(f" - {r}")
+    # Build the whole report and emit it with one write instead of a print() per line.
+    out: List[str] = [
+        _HDR,
+        f"{name}\n",
+        _FINAL_LINE("OK" if v.label == "OK" else "NOT_OK", v.label, v.nudity_risk, v.violence_risk, v.hate_risk),
+    ]
+    out.extend(map(_REASON_LINE, v.reasons))
     if rep.get("auto_learn"):
-        print(f" - {rep['auto_learn']}")
+        out.append(_REASON_LINE(rep["auto_learn"]))
 
     for r in results:
         st = (r.status or "").lower()
-        tag = {"ok":"ok", "skipped":"skipped", "error":"error"}.get(st, st)
+        tag = _STATUS_TAGS.get(st, st)
         msg = ""
         if st == "ok" and r.scores:
-            parts = []
-            for k, vv in _select_scores(r.name, r.scores):
-                parts.append(f"{k}={float(vv):.2f}")
-            if parts:
-                msg = ", ".join(parts)
+            msg = ", ".join(_SCORE_PART(k, float(vv)) for k, vv in _select_scores(r.name, r.scores))
         elif r.error:
             msg = r.error
-        took = f"{int(r.took_ms or 0)}ms"
-        print(f"   [{tag:<7}] {r.name:<22} ({took}) {msg}")
+        out.append(_RESULT_LINE(tag, r.name, int(r.took_ms or 0), msg))
+    sys.stdout.write("".join(out))
 
 def main(argv: List[str] | None = None) -> int:
     # Ensure .env was loaded (already loaded on import), but keep debug message consistent
@@ -174,31 +237,65 @@ def main(argv: List[str] | None = None) -> int:
     )
     ap.add_argument("--recursive", action="store_true", help="When input is a directory, recurse")
     ap.add_argument("--json", dest="json_out", default="", help="Write report(s) to JSON file")
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=_env_int("MODIMG_WORKERS", 1),
+        help="Worker processes for directory inputs (0 = all CPU cores)",
+    )
     args = ap.parse_args(argv)
 
     if not args.input:
         ap.error("input is required (path/dir/url)")
 
+    paths = _iter_paths(args.input, args.recursive)
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    if not os.path.isdir(args.input):
+        workers = 1
+    one = partial(_process_one, no_apis=args.no_apis, sample_frames=args.sample_frames)
+
+    # JSON Lines output is written per report, so nothing is buffered for large folders.
+    jsonl = None
+    if args.json_out and (args.json_out.lower().endswith(".jsonl") or _env_int("MODIMG_JSONL", 0) == 1):
+        jsonl = open(args.json_out, "wb")
+
     reports: List[Dict[str, Any]] = []
-    for p in _iter_paths(args.input, args.recursive):
-        rep = run_on_input(p, no_apis=args.no_apis, sample_frames=args.sample_frames)
-        _print_report(rep)
-        reports.append({
-            "name": rep["name"],
-            "path": rep["path"],
-            "verdict": rep["verdict"].__dict__,
-            "results": [r.__dict__ for r in rep["results"]],
-            "auto_learn": rep.get("auto_learn"),
-        })
-
-    if args.json_out:
-        with open(args.json_out, "w", encoding="utf-8") as f:
-            json.dump(reports if len(reports)>1 else reports[0], f, ensure_ascii=False, indent=2)
+    all_ok = True
+    pool = multiprocessing.Pool(workers, initializer=_warm_engines, initargs=(workers,)) if workers > 1 else None
+    try:
+        # imap keeps input order, so output is identical to the serial run;
+        # printing only happens here in the parent.
+        for rep in (pool.imap(one, paths) if pool else map(one, paths)):
+            _print_report(rep)
+            all_ok = all_ok and rep["verdict"].label == "OK"
+            if not args.json_out:
+                continue
+            entry = {
+                "name": rep["name"],
+                "path": rep["path"],
+                "verdict": rep["verdict"],
+                "results": rep["results"],
+                "auto_learn": rep.get("auto_learn"),
+            }
+            if jsonl is not None:
+                jsonl.write(json_dumps(entry) + b"\n")
+                jsonl.flush()
+            else:
+                reports.append(entry)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+            _compact_openai_cache()
+        if jsonl is not None:
+            jsonl.close()
+
+    if args.json_out and jsonl is None:
+        with open(args.json_out, "wb") as f:
+            f.write(json_dumps(reports if len(reports)>1 else reports[0], indent=True))
 
     # exit code: 0 if all OK, 2 otherwise
-    if all(r["verdict"]["label"] == "OK" for r in reports):
-        return 0
-    return 2
+    return 0 if all_ok else 2
 
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -1,36 +1,65 @@
 """Configuration and .env loading (no external dependency required)."""
 from __future__ import annotations
 
+import mmap
 import os
+import re
 
+# One match per KEY=VALUE line (optionally prefixed by "export " / "set ").
+# Comment lines and lines without "=" simply don't match.
+_ENV_LINE_RE = re.compile(
+    r"^[ \t]*(?:(?:export|set) [ \t]*)?([^#=\s][^=\n]*?)[ \t]*=(.*)$",
+    re.MULTILINE | re.IGNORECASE,
+)
 
-def _parse_env_line(line: str):
-    """Parse a single env line: KEY=VALUE, export KEY=VALUE, set KEY=VALUE."""
-    s = line.strip()
-    if not s or s.startswith("#"):
-        return None
-    lower = s.lower()
-    if lower.startswith("export "):
-        s = s[7:].lstrip()
-    elif lower.startswith("set "):
-        s = s[4:].lstrip()
-    if "=" not in s:
-        return None
-    k, v = s.split("=", 1)
-    k = k.strip().lstrip("\ufeff")  # strip BOM if present
-    v = v.strip()
-    if not k:
-        return None
 
+def _clean_env_value(v: str) -> str:
+    """Strip whitespace, inline comments on unquoted values and wrapping quotes."""
+    v = v.strip()
+    if v and v[0] == v[-1] and v[0] in "\"'":
+        # Strip wrapping quotes (quoted values keep any " #")
+        return v[1:-1]
     # Strip inline comment for unquoted values: KEY=VAL # comment
-    if v and not ((v.startswith('"') and v.endswith('"')) or (v.startswith("'") and v.endswith("'"))):
-        if " #" in v:
-            v = v.split(" #", 1)[0].rstrip()
-
-    # Strip wrapping quotes
-    if (v.startswith('"') and v.endswith('"')) or (v.startswith("'") and v.endswith("'")):
-        v = v[1:-1]
-    return k, v
+    i = v.find(" #")
+    if i >= 0:
+        v = v[:i].rstrip()
+        if v and v[0] == v[-1] and v[0] in "\"'":
+            v = v[1:-1]
+    return v
+
+
+def _parse_env_text(text: str, *, first_wins: bool = True) -> dict[str, str]:
+    """Parse a whole .env buffer in one regex pass.
+
+    Without override, duplicate keys keep the *first* value (later lines would
+    find the key already set); with override the last line wins.
+    """
+    parsed: dict[str, str] = {}
+    for m in _ENV_LINE_RE.finditer(text):
+        k = m.group(1)
+        if first_wins and k in parsed:
+            continue
+        parsed[k] = _clean_env_value(m.group(2))
+    return parsed
+
+
+# Above this size the file is mapped instead of copied through a read buffer.
+_MMAP_MIN_BYTES = 64 * 1024
+
+
+def _read_env_file(path: str) -> str:
+    """Read and decode a whole env file in one go (BOM-aware, universal newlines)."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= _MMAP_MIN_BYTES:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                data = mm[:]
+        else:
+            data = f.read()
+    text = data.decode("utf-8-sig")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
 
 
 def load_dotenv(path: str, *, override: bool | None = None) -> list[str]:
@@ -42,16 +71,11 @@ def load_dotenv(path: str, *, override: bool | None = None) -> list[str]:
     try:
         if not os.path.exists(path):
             return loaded
-        with open(path, "r", encoding="utf-8-sig") as f:
-            for line in f:
-                parsed = _parse_env_line(line)
-                if not parsed:
-                    continue
-                k, v = parsed
-                if (not override) and (k in os.environ):
-                    continue
-                os.environ[k] = v
-                loaded.append(k)
+        parsed = _parse_env_text(_read_env_file(path), first_wins=not override)
+        if not override:
+            parsed = {k: v for k, v in parsed.items() if k not in os.environ}
+        os.environ.update(parsed)
+        loaded = list(parsed)
     except Exception:
         return loaded
     return loaded
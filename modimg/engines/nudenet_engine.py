@@ -1,15 +1,64 @@
 from __future__ import annotations
 
 import os
-from typing import Any, List, Tuple, Optional
-from PIL import Image
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple, Optional
 
 from ..types import Engine, EngineResult
-from ..utils import now_ms
+from ..utils import env_float, env_int, now_ms
+
+
+@lru_cache(maxsize=1)
+def _early_exit_threshold() -> float:
+    # Once frame 0 reaches this exposed score the last frame cannot change the
+    # verdict anymore; values above 1.0 always check both frames.
+    return env_float("NUDENET_EARLY_EXIT", 0.95)
+
+
+@lru_cache(maxsize=1)
+def _max_side() -> int:
+    # NudeNet resizes to its own (much smaller) input size anyway, so full-res
+    # 4K frames only cost conversion time; 0 keeps the original resolution.
+    return env_int("NUDENET_MAX_SIDE", 1280)
+
+
+# Detection labels emitted by NudeNet 3.x.
+_EXPOSED_LABELS = frozenset((
+    "FEMALE_GENITALIA_EXPOSED", "FEMALE_BREAST_EXPOSED", "MALE_GENITALIA_EXPOSED",
+    "MALE_BREAST_EXPOSED", "BUTTOCKS_EXPOSED", "ANUS_EXPOSED", "BELLY_EXPOSED",
+    "ARMPITS_EXPOSED", "FEET_EXPOSED",
+))
+_COVERED_LABELS = frozenset((
+    "FEMALE_GENITALIA_COVERED", "FEMALE_BREAST_COVERED", "BUTTOCKS_COVERED",
+    "ANUS_COVERED", "BELLY_COVERED", "ARMPITS_COVERED", "FEET_COVERED",
+))
+_EXPOSED, _COVERED, _OTHER = 1, 2, 0
+
+# label -> kind; unknown labels (older NudeNet, other casing) are classified once
+# with the substring rule and remembered.
+_LABEL_KIND: Dict[Any, int] = {
+    **dict.fromkeys(_EXPOSED_LABELS, _EXPOSED),
+    **dict.fromkeys(_COVERED_LABELS, _COVERED),
+}
+
+
+def _label_kind(cls: Any) -> int:
+    try:
+        kind = _LABEL_KIND.get(cls)
+    except TypeError:  # unhashable label
+        kind, cls = None, str(cls)
+    if kind is None:
+        up = str(cls).upper()
+        kind = _EXPOSED if "EXPOSED" in up else (_COVERED if "COVERED" in up else _OTHER)
+        if len(_LABEL_KIND) < 1024:
+            _LABEL_KIND[cls] = kind
+    return kind
 
 class NudeNetEngine(Engine):
     """Offline nudity detection via NudeNet (optional)."""
     name = "NudeNet"
+    run_lock = threading.Lock()  # shared cached model
 
     _DETECTOR = None
 
@@ -33,26 +82,40 @@ class NudeNetEngine(Engine):
         exposed_max = 0.0
         covered_max = 0.0
 
-        def _to_pil(x: Any) -> Image.Image:
-            if hasattr(x, "pil"):
-                return getattr(x, "pil")
-            return x
+        def _to_rgb(x: Any) -> Any:
+            if hasattr(x, "rgb"):
+                return x.rgb(max_side)
+            im = x if x.mode == "RGB" else x.convert("RGB")
+            return np.asarray(im, dtype=np.uint8)
 
         frames_use = frames[:1] if not frames else ([frames[0], frames[-1]] if len(frames) > 1 else frames)
+        max_side = _max_side()
+        early_exit = _early_exit_threshold()
+        prev_arr = None
         for fr in frames_use:
-            im = _to_pil(fr)
-            arr = np.array(im.convert("RGB"))
+            if prev_arr is not None and exposed_max >= early_exit:
+                break
+            arr = _to_rgb(fr)
+            if prev_arr is not None and (arr is prev_arr or np.array_equal(arr, prev_arr)):
+                # static image wrapped as an animation: last frame == first frame
+                continue
+            prev_arr = arr
             try:
                 dets = detector.detect(arr) or []
             except Exception:
                 dets = []
             for d in dets:
-                cls = str(d.get("class", "")).upper()
-                score = float(d.get("score", 0.0) or 0.0)
-                if "EXPOSED" in cls:
-                    exposed_max = max(exposed_max, score)
-                elif "COVERED" in cls:
-                    covered_max = max(covered_max, score)
+                kind = _label_kind(d.get("class", ""))
+                if kind == _OTHER:
+                    continue
+                score = d.get("score", 0.0) or 0.0
+                if type(score) is not float:
+                    score = float(score)
+                if kind == _EXPOSED:
+                    if score > exposed_max:
+                        exposed_max = score
+                elif score > covered_max:
+                    covered_max = score
 
         return EngineResult(
             name=self.name,
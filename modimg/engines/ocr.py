@@ -1,19 +1,111 @@
 from __future__ import annotations
 
+import hashlib
 import os
 import re
-from typing import List, Tuple
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
 
 from ..types import Engine, EngineResult, Frame
-from ..utils import env_int, now_ms
+from ..utils import now_ms, parse_int
 from ..config import project_root
 
+# pytesseract handle, imported on first use and reused for every later frame/image.
+_pytesseract = None
+
+
+def _import_pytesseract():
+    global _pytesseract
+    if _pytesseract is None:
+        import pytesseract
+        _pytesseract = pytesseract
+    return _pytesseract
+
+
+# Optional in-process binding (loads the language model once); False = not usable.
+_tesserocr: Any = None
+
+
+def _import_tesserocr():
+    global _tesserocr
+    if _tesserocr is None:
+        try:
+            import tesserocr
+            _tesserocr = tesserocr
+        except Exception:
+            _tesserocr = False
+    return _tesserocr or None
+
+
+class _OCRConfig(NamedTuple):
+    tesseract_cmd: str
+    lang: str
+    max_frames: int
+    min_len: int
+    cache_size: int
+
+
+_OCR_ENV = ("TESSERACT_CMD", "OCR_LANG", "OCR_MAX_FRAMES", "OCR_MIN_LEN", "OCR_CACHE_SIZE")
+
+
+@lru_cache(maxsize=8)
+def _parse_ocr_config(raw: Tuple[Optional[str], ...]) -> _OCRConfig:
+    cmd, lang, max_frames, min_len, cache_size = raw
+    return _OCRConfig(
+        tesseract_cmd=(cmd or "").strip(),
+        lang=(lang or "eng").strip() or "eng",
+        max_frames=parse_int(max_frames, 2),
+        min_len=parse_int(min_len, 3),
+        cache_size=parse_int(cache_size, 512),
+    )
+
+
+def _ocr_config() -> _OCRConfig:
+    """OCR settings, parsed once per distinct env snapshot."""
+    return _parse_ocr_config(tuple(map(os.environ.get, _OCR_ENV)))
+
+
+# Numbered/named backreferences would point at the wrong group once a pattern is
+# wrapped into the combined alternation.
+_BACKREF_RE = re.compile(r"\\[1-9]|\(\?P=")
+
+# Lines without any regex metacharacter are plain words/phrases; a lowercase
+# substring test is much cheaper than a regex search for those.
+_REGEX_META_RE = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+
+def _combine_patterns(pats: List[re.Pattern]) -> Optional[re.Pattern]:
+    """One alternation over all patterns, each wrapped in a named group ``_p<i>``."""
+    if not pats or any(_BACKREF_RE.search(p.pattern) for p in pats):
+        return None
+    try:
+        return re.compile(
+            "|".join(f"(?P<_p{i}>{p.pattern})" for i, p in enumerate(pats)),
+            re.IGNORECASE,
+        )
+    except re.error:
+        # e.g. duplicate group names or inline global flags across lines
+        return None
+
 class OCREngine(Engine):
     name = "OCR text"
+    run_lock = threading.Lock()  # class-level text cache + global pytesseract.tesseract_cmd
+
+    # Cache compiled patterns per process to reduce CPU:
+    # (mtime, all patterns, [(index, lowercase ASCII literal)], [(index, regex)], their alternation)
+    # Indexes are line positions in `all patterns`; the first matching line is the reported hit.
+    _CACHE: tuple[float, List[re.Pattern], List[Tuple[int, str]], List[Tuple[int, re.Pattern]], Optional[re.Pattern]] = (0.0, [], [], [], None)
 
-    # Cache compiled patterns per process to reduce CPU.
-    _CACHE: tuple[float, List[re.Pattern]] = (0.0, [])
+    # OCR text per (frame content hash, lang); identical frames recur a lot in folder scans.
+    _TEXT_CACHE: "OrderedDict[Tuple[bytes, str], str]" = OrderedDict()
+
+    # tesserocr API handles per lang; the C++ API is not thread-safe.
+    _TESS_APIS: Dict[str, Any] = {}
+    _TESS_LOCK = threading.Lock()
 
     def __init__(self) -> None:
         super().__init__()
@@ -23,7 +115,7 @@ class OCREngine(Engine):
         if os.getenv("OCR_ENABLE", "0").strip() != "1":
             return False, "disabled (set OCR_ENABLE=1)"
         try:
-            import pytesseract  # noqa
+            _import_pytesseract()
         except Exception as e:
             return False, f"pytesseract not available: {type(e).__name__}"
         if not os.path.exists(self.blocklist_path):
@@ -35,11 +127,13 @@ class OCREngine(Engine):
             mtime = os.path.getmtime(self.blocklist_path)
         except Exception:
             return []
-        cached_mtime, cached_pats = OCREngine._CACHE
+        cached_mtime, cached_pats = OCREngine._CACHE[:2]
         if cached_pats and cached_mtime == mtime:
             return cached_pats
 
         pats: List[re.Pattern] = []
+        literals: List[Tuple[int, str]] = []
+        regexes: List[Tuple[int, re.Pattern]] = []
         try:
             with open(self.blocklist_path, "r", encoding="utf-8") as f:
                 for line in f:
@@ -47,55 +141,152 @@ class OCREngine(Engine):
                     if not s or s.startswith("#"):
                         continue
                     try:
-                        pats.append(re.compile(s, re.IGNORECASE))
+                        pat = re.compile(s, re.IGNORECASE)
+                        literal = not _REGEX_META_RE.search(s)
                     except re.error:
                         # treat as literal
-                        pats.append(re.compile(re.escape(s), re.IGNORECASE))
+                        pat = re.compile(re.escape(s), re.IGNORECASE)
+                        literal = True
+                    # Only ASCII lines take the substring path: lower() matches IGNORECASE
+                    # for ASCII, but not for e.g. final sigma or the Kelvin sign.
+                    if literal and s.isascii():
+                        literals.append((len(pats), s.lower()))
+                    else:
+                        regexes.append((len(pats), pat))
+                    pats.append(pat)
         except Exception:
-            pats = []
-        OCREngine._CACHE = (mtime, pats)
+            pats, literals, regexes = [], [], []
+        OCREngine._CACHE = (mtime, pats, literals, regexes, _combine_patterns([p for _, p in regexes]))
         return pats
 
+    @staticmethod
+    def _find_hit(joined: str, patterns: List[re.Pattern]) -> Optional[str]:
+        """Pattern text of the first blocklist line (in file order) that matches, or None."""
+        _, cached_pats, literals, regexes, combined = OCREngine._CACHE
+        if cached_pats is patterns and joined.isascii():
+            best = len(patterns)
+            low = joined.lower()
+            for i, lit_low in literals:
+                if lit_low in low:
+                    best = i
+                    break
+            # The alternation only tells whether any regex matches (it reports the leftmost
+            # match, not the first line), so use it to skip the per-line scan when none does.
+            if regexes and (combined is None or combined.search(joined)):
+                for i, pat in regexes:
+                    if i >= best:
+                        break
+                    if pat.search(joined):
+                        best = i
+                        break
+            return patterns[best].pattern if best < len(patterns) else None
+        for pat in patterns:
+            if pat.search(joined):
+                return pat.pattern
+        return None
+
+    @staticmethod
+    def _recognize(pytesseract, pils: List[Any], lang: str) -> List[str]:
+        """OCR all images with a single Tesseract setup instead of one process per frame."""
+        global _tesserocr
+        tesserocr = _import_tesserocr()
+        if tesserocr is not None:
+            with OCREngine._TESS_LOCK:
+                try:
+                    api = OCREngine._TESS_APIS.get(lang)
+                    if api is None:
+                        api = OCREngine._TESS_APIS[lang] = tesserocr.PyTessBaseAPI(lang=lang)
+                except Exception:
+                    # e.g. tessdata not found by the binding; stick to pytesseract
+                    _tesserocr = False
+                else:
+                    out = []
+                    for im in pils:
+                        api.SetImage(im)
+                        out.append(api.GetUTF8Text() or "")
+                    return out
+
+        if len(pils) == 1:
+            return [pytesseract.image_to_string(pils[0], lang=lang) or ""]
+
+        # One tesseract process for all frames: multipage TIFF, pages come back separated by \f.
+        with tempfile.TemporaryDirectory() as td:
+            fp = os.path.join(td, "frames.tif")
+            first, *rest = [im if im.mode in ("1", "L", "RGB") else im.convert("RGB") for im in pils]
+            first.save(fp, format="TIFF", save_all=True, append_images=rest)
+            txt = pytesseract.image_to_string(fp, lang=lang) or ""
+        pages = txt.split("\f")
+        if len(pages) == len(pils) + 1 and not pages[-1].strip():
+            pages.pop()
+        if len(pages) != len(pils):
+            raise ValueError(f"tesseract returned {len(pages)} pages for {len(pils)} frames")
+        return pages
+
+    @staticmethod
+    def _ocr_texts(pytesseract, pils: List[Any], lang: str) -> List[str]:
+        size = _ocr_config().cache_size
+        cache = OCREngine._TEXT_CACHE
+        texts: List[Optional[str]] = [None] * len(pils)
+        keys: List[Tuple[bytes, str]] = []
+        if size > 0:
+            for i, pil in enumerate(pils):
+                h = hashlib.blake2b(pil.tobytes(), digest_size=16)
+                h.update(f"{pil.mode}:{pil.size}".encode())
+                key = (h.digest(), lang)
+                keys.append(key)
+                txt = cache.get(key)
+                if txt is not None:
+                    cache.move_to_end(key)
+                    texts[i] = txt
+
+        todo = [i for i, t in enumerate(texts) if t is None]
+        if todo:
+            try:
+                found = OCREngine._recognize(pytesseract, [pils[i] for i in todo], lang)
+            except Exception:
+                # fall back to one call per frame so a single bad frame only loses its own text
+                found = []
+                for i in todo:
+                    try:
+                        found.append(pytesseract.image_to_string(pils[i], lang=lang) or "")
+                    except Exception:
+                        found.append(None)  # not cached, retried next time
+            for i, txt in zip(todo, found):
+                texts[i] = txt or ""
+                if size > 0 and txt is not None:
+                    cache[keys[i]] = txt
+            while len(cache) > max(size, 0):
+                cache.popitem(last=False)
+        return [t or "" for t in texts]
+
     def run(self, path: str, frames: List[Frame], max_api_frames: int = 3) -> EngineResult:
         start = now_ms()
         ok, why = self.available()
         if not ok:
             return EngineResult(name=self.name, status="skipped", error=why, took_ms=now_ms()-start)
 
-        import pytesseract
+        pytesseract = _import_pytesseract()
+        cfg = _ocr_config()
         # optional custom tesseract path
-        tess = os.getenv("TESSERACT_CMD", "").strip()
-        if tess:
-            pytesseract.pytesseract.tesseract_cmd = tess
+        if cfg.tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = cfg.tesseract_cmd
 
-        lang = os.getenv("OCR_LANG", "eng").strip() or "eng"
-        max_frames = env_int("OCR_MAX_FRAMES", 2)
-        min_len = env_int("OCR_MIN_LEN", 3)
+        lang = cfg.lang
+        max_frames = cfg.max_frames
+        min_len = cfg.min_len
 
         patterns = self._load_patterns()
         if not patterns:
             return EngineResult(name=self.name, status="skipped", error="ocr blocklist empty", took_ms=now_ms()-start)
 
-        text_all: List[str] = []
         use = frames[:max_frames] if max_frames > 0 else frames[:1]
-        for fr in use:
-            try:
-                txt = pytesseract.image_to_string(fr.pil, lang=lang) or ""
-            except Exception:
-                txt = ""
-            if txt:
-                text_all.append(txt)
+        text_all = [txt for txt in self._ocr_texts(pytesseract, [fr.pil for fr in use], lang) if txt]
 
         joined = "\n".join(text_all).strip()
         if len(joined) < min_len:
             return EngineResult(name=self.name, status="ok", scores={"ocr_match": 0.0}, details={"text": ""}, took_ms=now_ms()-start)
 
-        hit = None
-        for pat in patterns:
-            m = pat.search(joined)
-            if m:
-                hit = pat.pattern
-                break
+        hit = self._find_hit(joined, patterns)
 
         return EngineResult(
             name=self.name,
@@ -1,40 +1,178 @@
 from __future__ import annotations
 
 import os
-import json
 import time
 import random
-import base64
 import threading
 import atexit
 import hashlib
+import operator
+import queue
 import re
-from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import util as mp_util
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
 
 from ..types import Engine, EngineResult, Frame
-from ..utils import now_ms, safe_model_dump
+from ..utils import json_dumps, json_loads, now_ms, safe_model_dump
 
 
-def _read_text(p: str) -> str:
-    with open(p, "r", encoding="utf-8") as f:
-        return f.read()
+# Precompiled patterns for the error-handling path (hit once per retry).
+_ERR_CODE_RE = re.compile(r"Error code:\s*(\d{3})")
+_AUTH_MSG_RE = re.compile(r"deactivated|invalid api key|unauthorized", re.IGNORECASE)
+
 
+# Result of the one-time `import openai`: (module or None, error text).
+_OPENAI_IMPORT: Optional[Tuple[Any, str]] = None
 
-def _write_text(p: str, s: str) -> None:
-    with open(p, "w", encoding="utf-8") as f:
-        f.write(s)
+
+def _import_openai() -> Tuple[Any, str]:
+    global _OPENAI_IMPORT
+    if _OPENAI_IMPORT is None:
+        try:
+            import openai
+            _OPENAI_IMPORT = (openai, "")
+        except Exception as e:
+            _OPENAI_IMPORT = (None, str(e))
+    return _OPENAI_IMPORT
+
+
+# Categories reported in `scores`, in a fixed order. Cache lines store the scores as a
+# plain float array in _PACKED_KEYS order instead of repeating every key per entry.
+_CATS: Tuple[str, ...] = (
+    "sexual",
+    "sexual/minors",
+    "violence",
+    "violence/graphic",
+    "self-harm",
+    "self-harm/intent",
+    "self-harm/instructions",
+    "hate",
+    "hate/threatening",
+    "harassment",
+    "harassment/threatening",
+    "illicit",
+    "illicit/violent",
+)
+_PACKED_KEYS: Tuple[str, ...] = _CATS + ("max_any_category", "flagged")
+_ZERO_SCORES: Dict[str, float] = dict.fromkeys(_CATS, 0.0)
+_GET_SCORES = operator.itemgetter(*_CATS)
+
+
+def _pack_cache_line(ck: str, entry: Dict[str, Any]) -> bytes:
+    scores = entry.get("scores") or {}
+    packed = [float(scores.get(k, 0.0)) for k in _PACKED_KEYS]
+    return json_dumps({"k": ck, "s": packed, "d": entry.get("details") or {}}) + b"\n"
+
+
+def _env_num(raw: Optional[str], cast: Any, default: Any) -> Any:
+    try:
+        return cast(raw) if raw is not None else default
+    except Exception:
+        return default
+
+
+class _RunConfig(NamedTuple):
+    model: str
+    timeout: float
+    max_retries: int
+    base_sleep: float
+    max_sleep: float
+    max_total_sleep: float
+    policy_429: str  # retry | skip
+    max_429_retries: int
+    max_jpeg_bytes: int
+
+
+_RUN_ENV = (
+    "OPENAI_MODERATION_MODEL",
+    "OPENAI_REQUEST_TIMEOUT_SEC",
+    "OPENAI_MAX_RETRIES",
+    "OPENAI_BACKOFF_BASE_SEC",
+    "OPENAI_BACKOFF_MAX_SEC",
+    "OPENAI_MAX_TOTAL_SLEEP_SEC",
+    "OPENAI_429_POLICY",
+    "OPENAI_MAX_429_RETRIES",
+    "OPENAI_MAX_JPEG_BYTES",
+)
+
+
+@lru_cache(maxsize=8)
+def _parse_run_config(raw: Tuple[Optional[str], ...]) -> _RunConfig:
+    model, timeout, retries, base, mx, total, policy, r429, jpeg = raw
+    return _RunConfig(
+        model=model or "omni-moderation-latest",
+        timeout=_env_num(timeout, float, 20.0),
+        max_retries=_env_num(retries, int, 6),
+        base_sleep=_env_num(base, float, 1.0),
+        max_sleep=_env_num(mx, float, 10.0),
+        max_total_sleep=_env_num(total, float, 30.0),
+        policy_429=(policy or "retry").strip().lower(),
+        max_429_retries=_env_num(r429, int, 3),
+        max_jpeg_bytes=_env_num(jpeg, int, 524288),
+    )
+
+
+def _run_config() -> _RunConfig:
+    """Retry/timeout settings, parsed once per distinct env snapshot."""
+    return _parse_run_config(tuple(map(os.environ.get, _RUN_ENV)))
+
+
+def _to_float(v: Any) -> float:
+    try:
+        return float(v)
+    except Exception:
+        return 0.0
+
+
+def _as_dict(obj: Any) -> Dict[str, Any]:
+    if obj is None:
+        return {}
+    if isinstance(obj, dict):
+        return obj
+    dump = getattr(obj, "model_dump", None)
+    if dump is not None:
+        return dump(by_alias=True)  # API keys like "sexual/minors", not field names
+    return dict(vars(obj))
+
+
+def _first_result(resp: Any) -> Dict[str, Any]:
+    """The four fields we use from results[0], read directly off the SDK object.
+
+    Falls back to a full dump for responses that aren't SDK models.
+    """
+    results = getattr(resp, "results", None)
+    if results:
+        r = results[0]
+        return {
+            "categories": _as_dict(getattr(r, "categories", None)),
+            "category_scores": _as_dict(getattr(r, "category_scores", None)),
+            "flagged": getattr(r, "flagged", False),
+            "category_applied_input_types": _as_dict(getattr(r, "category_applied_input_types", None)) or None,
+        }
+    d = safe_model_dump(resp)
+    return (d.get("results") or [{}])[0]
+
+
+def _read_bytes(p: str) -> bytes:
+    with open(p, "rb") as f:
+        return f.read()
 
 
 class OpenAIModerationEngine(Engine):
     name = "OpenAI Moderation"
 
-    # Global rate-limiter shared across instances (important when scanning many files)
+    # Global rate-limiter shared across instances (important when scanning many files).
+    # GCRA: _GLOBAL_TAT_MONO is the theoretical arrival time of the next request.
     _GLOBAL_LOCK = threading.Lock()
-    _GLOBAL_LAST_CALL_MONO: float = 0.0
+    _GLOBAL_TAT_MONO: float = 0.0
 
     # Simple on-disk cache to avoid re-calling OpenAI for the same bytes
     _CACHE_LOCK = threading.Lock()
-    _CACHE: Optional[Dict[str, Any]] = None
+    _CACHE: Optional["OrderedDict[str, Any]"] = None  # LRU: most recently used last
     _CACHE_PATH: Optional[str] = None
     _CACHE_DIR_READY: bool = False
     _CACHE_DIR_ERROR: bool = False
@@ -44,12 +182,35 @@ class OpenAIModerationEngine(Engine):
     _CACHE_DIR_RETRY_MULT: float = 2.0
     _CACHE_DIR_RETRY_MAX: float = 60.0
 
-    # Reduce IO: flush cache periodically (and on process exit)
-    _CACHE_DIRTY: bool = False
-    _CACHE_WRITES_SINCE_FLUSH: int = 0
-    _CACHE_FLUSH_EVERY_N: int = 25
+    # The cache file is an append-only log (one {"k","s","d"} JSON object per line);
+    # it is rewritten only when stale lines outnumber live entries.
+    _CACHE_LOG_LINES: int = 0
+    _CACHE_COMPACT_MIN_LINES: int = 200
+    # Pool workers share one log file: they only append, and the parent compacts once
+    # after the pool joins (see _compact_shared_log).
+    _COMPACT_IN_PROCESS: bool = True
+    # Write-behind: new entries are queued and appended by one daemon thread, so a
+    # moderation response never waits on disk I/O. _WRITE_LOCK serializes file writes.
+    # Only keys still in _DIRTY_KEYS are appended: repeated stores of one key, entries
+    # evicted before the write, and entries a compaction already wrote are skipped.
+    _WRITE_QUEUE: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+    _DIRTY_KEYS: set = set()
+    _WRITE_LOCK = threading.Lock()
+    _WRITER_PID: int = 0  # pid that owns the writer thread (a forked child starts its own)
     _ATEXIT_REGISTERED: bool = False
 
+    # Single-flight: identical requests (same cache key) running concurrently share one API call
+    _INFLIGHT_LOCK = threading.Lock()
+    _INFLIGHT: Dict[str, threading.Event] = {}
+
+    # Shared SDK client so the underlying HTTP connection pool (keep-alive, TLS) is reused
+    _CLIENT_LOCK = threading.Lock()
+    _CLIENT: Any = None
+    _CLIENT_SIG: Optional[Tuple[Any, ...]] = None
+
+    # (env signature, available() result)
+    _AVAILABLE_CACHE: Optional[Tuple[Tuple[Any, ...], Tuple[bool, str]]] = None
+
     # If we detect a permanent auth problem (401/403), disable OpenAI for the remainder of the run
     _DISABLED_REASON: Optional[str] = None
 
@@ -58,6 +219,16 @@ class OpenAIModerationEngine(Engine):
         self.extra_text = (extra_text or "").strip()
 
     def available(self) -> Tuple[bool, str]:
+        # Memoized on everything the answer depends on, so per-file calls are a tuple compare.
+        sig = (os.getenv("OPENAI_DISABLE", "0"), os.getenv("OPENAI_API_KEY"), OpenAIModerationEngine._DISABLED_REASON)
+        cached = OpenAIModerationEngine._AVAILABLE_CACHE
+        if cached is not None and cached[0] == sig:
+            return cached[1]
+        res = self._check_available()
+        OpenAIModerationEngine._AVAILABLE_CACHE = (sig, res)
+        return res
+
+    def _check_available(self) -> Tuple[bool, str]:
         if os.getenv("OPENAI_DISABLE", "0").strip() == "1":
             return False, "disabled via OPENAI_DISABLE=1"
         if OpenAIModerationEngine._DISABLED_REASON:
@@ -67,11 +238,10 @@ class OpenAIModerationEngine(Engine):
         # Treat common placeholders / empty as not set
         if not key or key.lower() in {"changeme", "your_key_here", "your-api-key", "none"}:
             return False, "OPENAI_API_KEY not set"
-        try:
-            import openai  # noqa: F401
-            return True, ""
-        except Exception as e:
-            return False, f"missing dependency (pip install openai): {e}"
+        mod, err = _import_openai()
+        if mod is None:
+            return False, f"missing dependency (pip install openai): {err}"
+        return True, ""
 
     @staticmethod
     def _script_dir() -> str:
@@ -103,37 +273,163 @@ class OpenAIModerationEngine(Engine):
             os.makedirs(d, exist_ok=True)
         OpenAIModerationEngine._CACHE_DIR_READY = True
 
-    def _load_cache(self) -> Dict[str, Any]:
+    @staticmethod
+    def _replay_cache_log(data: bytes) -> Tuple["OrderedDict[str, Any]", int]:
+        """Rebuild the cache dict from the log; later lines win. Also accepts older {"k","v"} lines and the single-dict file."""
+        cache: "OrderedDict[str, Any]" = OrderedDict()
+        lines = 0
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            try:
+                obj = json_loads(line)
+            except Exception:
+                continue  # e.g. a torn last line after a crash
+            if not isinstance(obj, dict):
+                continue
+            lines += 1
+            packed = obj.get("s")
+            if "k" in obj and isinstance(packed, list) and len(packed) == len(_PACKED_KEYS):
+                ck = obj["k"]
+                cache[ck] = {"scores": dict(zip(_PACKED_KEYS, packed)), "details": obj.get("d") or {}}
+                cache.move_to_end(ck)
+            elif len(obj) == 2 and "k" in obj and "v" in obj:
+                ck = obj["k"]
+                cache[ck] = obj["v"]
+                cache.move_to_end(ck)  # later lines are more recent
+            else:
+                cache.update(obj)  # legacy format: whole cache dict on one line
+        return cache, lines
+
+    def _load_cache(self) -> "OrderedDict[str, Any]":
+        # Fast path without the lock: handing out the reference is atomic under the GIL.
+        cache = OpenAIModerationEngine._CACHE
+        if cache is not None:
+            return cache
         with OpenAIModerationEngine._CACHE_LOCK:
             if OpenAIModerationEngine._CACHE is not None:
                 return OpenAIModerationEngine._CACHE
             if not self._cache_enabled():
-                OpenAIModerationEngine._CACHE = {}
+                OpenAIModerationEngine._CACHE = OrderedDict()
                 return OpenAIModerationEngine._CACHE
             path = self._cache_path()
             try:
                 if os.path.exists(path):
-                    OpenAIModerationEngine._CACHE = json.loads(_read_text(path))
+                    cache, lines = self._replay_cache_log(_read_bytes(path))
                 else:
-                    OpenAIModerationEngine._CACHE = {}
+                    cache, lines = OrderedDict(), 0
             except Exception:
-                OpenAIModerationEngine._CACHE = {}
-            # Ensure we flush cache on process exit
+                cache, lines = OrderedDict(), 0
+            self._evict_over_cap(cache)
+            OpenAIModerationEngine._CACHE = cache
+            OpenAIModerationEngine._CACHE_LOG_LINES = lines
+            # Compact the log on process exit if it has grown stale
             if not OpenAIModerationEngine._ATEXIT_REGISTERED:
                 atexit.register(self._flush_cache_at_exit)
                 OpenAIModerationEngine._ATEXIT_REGISTERED = True
             return OpenAIModerationEngine._CACHE
 
+    @staticmethod
+    def _evict_over_cap(cache: "OrderedDict[str, Any]") -> None:
+        # Cap cache size; entries are kept in recency order, so evict least recently used first
+        try:
+            cap = int(os.getenv("OPENAI_CACHE_MAX_ITEMS", "2000"))
+        except Exception:
+            cap = 2000
+        if cap > 0:
+            while len(cache) > cap:
+                cache.popitem(last=False)
+
     def _flush_cache_at_exit(self) -> None:
         try:
-            self._save_cache(force=True)
+            with OpenAIModerationEngine._WRITE_LOCK:
+                self._write_pending([])
+                self._save_cache()
         except Exception:
             pass
 
-    def _save_cache(self, force: bool = False) -> None:
+    def _append_cache_entry(self, ck: str) -> None:
+        """Queue one new entry (already marked dirty) for the background writer."""
         if not self._cache_enabled():
             return
-        if not force and not OpenAIModerationEngine._CACHE_DIRTY:
+        OpenAIModerationEngine._WRITE_QUEUE.put(ck)
+        if OpenAIModerationEngine._WRITER_PID != os.getpid():
+            with OpenAIModerationEngine._WRITE_LOCK:
+                if OpenAIModerationEngine._WRITER_PID != os.getpid():
+                    threading.Thread(target=self._writer_loop, name="openai-cache-writer", daemon=True).start()
+                    OpenAIModerationEngine._WRITER_PID = os.getpid()
+                    # Pool workers skip atexit but run multiprocessing finalizers
+                    mp_util.Finalize(None, self._drain_writes, exitpriority=10)
+
+    def _writer_loop(self) -> None:
+        q = OpenAIModerationEngine._WRITE_QUEUE
+        while True:
+            first = q.get()
+            with OpenAIModerationEngine._WRITE_LOCK:
+                self._write_pending([first])
+
+    def _drain_writes(self) -> None:
+        """Write everything still queued (called at exit)."""
+        q = OpenAIModerationEngine._WRITE_QUEUE
+        with OpenAIModerationEngine._WRITE_LOCK:
+            queued: List[str] = []
+            while True:
+                try:
+                    queued.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            # The writer thread may have taken an (older) key off the queue and still be
+            # waiting for _WRITE_LOCK; it is still dirty, so write it first.
+            seen = set(queued)
+            with OpenAIModerationEngine._CACHE_LOCK:
+                held = [ck for ck in OpenAIModerationEngine._DIRTY_KEYS if ck not in seen]
+            self._write_pending(held + queued)
+
+    def _write_pending(self, keys: List[str]) -> None:
+        # Caller holds _WRITE_LOCK. Whatever queued up meanwhile goes out in the same append.
+        q = OpenAIModerationEngine._WRITE_QUEUE
+        while True:
+            try:
+                keys.append(q.get_nowait())
+            except queue.Empty:
+                break
+        if not keys:
+            return
+        cache = OpenAIModerationEngine._CACHE or {}
+        dirty = OpenAIModerationEngine._DIRTY_KEYS
+        items: List[Tuple[str, Any]] = []
+        with OpenAIModerationEngine._CACHE_LOCK:
+            # A key stored twice goes out once, at its last position: replay order is LRU order.
+            for ck in reversed(keys):
+                if ck in dirty:
+                    dirty.discard(ck)
+                    entry = cache.get(ck)
+                    if entry is not None:
+                        items.append((ck, entry))
+        items.reverse()
+        if not items:
+            return
+        try:
+            self._ensure_cache_dir()
+            with open(self._cache_path(), "ab") as f:
+                f.write(b"".join(_pack_cache_line(ck, entry) for ck, entry in items))
+            OpenAIModerationEngine._CACHE_LOG_LINES += len(items)
+        except Exception:
+            pass  # Cache is best-effort
+        if self._needs_compaction():
+            self._save_cache(force=True)
+
+    @staticmethod
+    def _needs_compaction() -> bool:
+        lines = OpenAIModerationEngine._CACHE_LOG_LINES
+        live = len(OpenAIModerationEngine._CACHE or {})
+        return lines > OpenAIModerationEngine._CACHE_COMPACT_MIN_LINES and lines > 2 * live
+
+    def _save_cache(self, force: bool = False) -> None:
+        """Rewrite the log with only the live entries (atomic replace)."""
+        if not self._cache_enabled() or not OpenAIModerationEngine._COMPACT_IN_PROCESS:
+            return
+        if not force and not self._needs_compaction():
             return
         self._ensure_cache_dir()
         path = self._cache_path()
@@ -141,11 +437,11 @@ class OpenAIModerationEngine(Engine):
             data = OpenAIModerationEngine._CACHE or {}
             tmp = path + ".tmp"
             try:
-                with open(tmp, "w", encoding="utf-8") as f:
-                    json.dump(data, f, ensure_ascii=False)
+                with open(tmp, "wb") as f:
+                    f.write(b"".join(_pack_cache_line(k, v) for k, v in data.items()))
                 os.replace(tmp, path)
-                OpenAIModerationEngine._CACHE_DIRTY = False
-                OpenAIModerationEngine._CACHE_WRITES_SINCE_FLUSH = 0
+                OpenAIModerationEngine._CACHE_LOG_LINES = len(data)
+                OpenAIModerationEngine._DIRTY_KEYS.clear()  # every live entry is on disk now
             except Exception:
                 # Cache is best-effort
                 try:
@@ -154,6 +450,23 @@ class OpenAIModerationEngine(Engine):
                 except Exception:
                     pass
 
+    def _compact_shared_log(self) -> None:
+        """Re-read the log other processes appended to and compact it if it has grown stale."""
+        if not self._cache_enabled():
+            return
+        path = self._cache_path()
+        with OpenAIModerationEngine._WRITE_LOCK:
+            self._write_pending([])
+            try:
+                cache, lines = self._replay_cache_log(_read_bytes(path))
+            except Exception:
+                return
+            self._evict_over_cap(cache)
+            with OpenAIModerationEngine._CACHE_LOCK:
+                OpenAIModerationEngine._CACHE = cache
+                OpenAIModerationEngine._CACHE_LOG_LINES = lines
+            self._save_cache()
+
     @staticmethod
     def _is_429(err: Exception) -> bool:
         # Works across openai SDK versions and generic errors
@@ -191,21 +504,15 @@ class OpenAIModerationEngine(Engine):
             except Exception:
                 pass
         # Fallback: parse from message
-        m = re.search(r"Error code:\s*(\d{3})", str(err))
-        if m:
-            try:
-                return int(m.group(1))
-            except Exception:
-                return None
-        return None
+        m = _ERR_CODE_RE.search(str(err))
+        return int(m.group(1)) if m else None
 
     @classmethod
     def _is_auth_error(cls, err: Exception) -> bool:
         sc = cls._status_code(err)
         if sc in (401, 403):
             return True
-        msg = str(err).lower()
-        return ("deactivated" in msg) or ("invalid api key" in msg) or ("unauthorized" in msg)
+        return _AUTH_MSG_RE.search(str(err)) is not None
 
     @staticmethod
     def _retry_after_seconds(err: Exception) -> Optional[float]:
@@ -217,7 +524,10 @@ class OpenAIModerationEngine(Engine):
                 headers = getattr(obj, "headers", None)
                 if not headers:
                     continue
-                ra = headers.get("retry-after") or headers.get("Retry-After")
+                # httpx/requests headers are case-insensitive; only a plain dict needs the second probe
+                ra = headers.get("retry-after")
+                if ra is None and isinstance(headers, dict):
+                    ra = headers.get("Retry-After")
                 if ra:
                     s = str(ra).strip().lower()
                     if s.endswith("s"):
@@ -228,217 +538,376 @@ class OpenAIModerationEngine(Engine):
         return None
 
     def _throttle_global(self) -> None:
-        # Ensures spacing between calls EVEN if each image gets a new engine instance
+        # Ensures spacing between calls EVEN if each image gets a new engine instance.
+        # Each caller reserves its own slot under the lock and sleeps outside of it,
+        # so waiting threads neither hold the lock nor poll.
         try:
             min_interval = float(os.getenv("OPENAI_MIN_INTERVAL_SEC", "1.0"))
         except Exception:
             min_interval = 1.0
         if min_interval <= 0:
             return
-        while True:
-            with OpenAIModerationEngine._GLOBAL_LOCK:
-                now = time.monotonic()
-                wait = (OpenAIModerationEngine._GLOBAL_LAST_CALL_MONO + min_interval) - now
-                if wait <= 0:
-                    # Reserve slot now (so retry loops can’t hammer)
-                    OpenAIModerationEngine._GLOBAL_LAST_CALL_MONO = now
-                    return
-            time.sleep(min(wait, 5.0))
+        try:
+            burst = max(1, int(os.getenv("OPENAI_BURST", "1")))
+        except Exception:
+            burst = 1
+        with OpenAIModerationEngine._GLOBAL_LOCK:
+            now = time.monotonic()
+            tat = max(OpenAIModerationEngine._GLOBAL_TAT_MONO, now)
+            # up to `burst` calls may go out back-to-back, then one per min_interval
+            slot = max(now, tat - (burst - 1) * min_interval)
+            OpenAIModerationEngine._GLOBAL_TAT_MONO = tat + min_interval
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+
+    @staticmethod
+    @contextmanager
+    def _single_flight(ck: str) -> Iterator[bool]:
+        """Yield True for the caller that should do the request; others wait for it, then get False."""
+        with OpenAIModerationEngine._INFLIGHT_LOCK:
+            ev = OpenAIModerationEngine._INFLIGHT.get(ck)
+            leader = ev is None
+            if leader:
+                ev = OpenAIModerationEngine._INFLIGHT[ck] = threading.Event()
+        if not leader:
+            ev.wait()
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            with OpenAIModerationEngine._INFLIGHT_LOCK:
+                OpenAIModerationEngine._INFLIGHT.pop(ck, None)
+            ev.set()
 
     def _cache_key(self, model_name: str, use_frames: List[Frame]) -> str:
-        # Stable key based on bytes + text + model
+        # Stable key based on bytes + text + model. Frames contribute their memoized
+        # SHA-256 (not jpeg_digest(), which depends on whether blake3 is installed and
+        # would orphan the persisted cache), so the JPEG bytes are hashed once per frame;
+        # text fields are length-prefixed so concatenations can't collide.
         h = hashlib.sha256()
-        h.update(model_name.encode("utf-8"))
-        h.update(b"\n")
-        h.update(self.extra_text.encode("utf-8"))
-        h.update(b"\n")
+        for part in (model_name.encode("utf-8"), self.extra_text.encode("utf-8")):
+            h.update(len(part).to_bytes(8, "little"))
+            h.update(part)
         for fr in use_frames:
             # hashing bytes directly avoids pHash collisions in API cache
-            h.update(hashlib.sha256(fr.get_jpeg_bytes()).digest())
+            h.update(fr.jpeg_sha256())
         return h.hexdigest()
 
+    @staticmethod
+    def _select_frames(frames: List[Frame], max_api_frames: int) -> List[Frame]:
+        use_n = max(1, int(max_api_frames or 1))
+        # Identical frames (static GIFs, duplicated samples) are sent only once.
+        use_frames: List[Frame] = []
+        seen: set = set()
+        for fr in frames[:use_n]:
+            d = fr.jpeg_digest()
+            if d not in seen:
+                seen.add(d)
+                use_frames.append(fr)
+        return use_frames
+
+    def _build_inputs(self, use_frames: List[Frame]) -> List[Dict[str, Any]]:
+        inputs: List[Dict[str, Any]] = []
+        if self.extra_text:
+            inputs.append({"type": "text", "text": self.extra_text})
+        # Oversized frames are re-encoded smaller; moderation accuracy plateaus well below that.
+        max_bytes = _run_config().max_jpeg_bytes
+        for fr in use_frames:
+            inputs.append({"type": "image_url", "image_url": {"url": "data:image/jpeg;base64," + fr.get_jpeg_b64(max_bytes)}})
+        return inputs
+
+    def _scores_from_result(self, r0: Dict[str, Any], use_frames: List[Frame]) -> Tuple[Dict[str, float], Dict[str, Any]]:
+        cats = (r0.get("categories") or {})
+        scores = (r0.get("category_scores") or {})
+
+        values = _GET_SCORES({**_ZERO_SCORES, **scores})
+        if not all(type(v) is float for v in values):
+            # rare path: ints, strings or None from unusual responses
+            values = tuple(map(_to_float, values))
+        out_scores: Dict[str, float] = dict(zip(_CATS, values))
+        out_scores["max_any_category"] = max(values)
+        out_scores["flagged"] = 1.0 if bool(r0.get("flagged")) else 0.0
+
+        details = {
+            "categories": cats,
+            "frames_used": [f.idx for f in use_frames],
+            "has_text": bool(self.extra_text),
+            "category_applied_input_types": r0.get("category_applied_input_types"),
+        }
+        return out_scores, details
+
+    def _store_cache(self, ck: str, entry: Dict[str, Any]) -> None:
+        if not self._cache_enabled():
+            return
+        cache = self._load_cache()
+        with OpenAIModerationEngine._CACHE_LOCK:
+            cache[ck] = entry
+            cache.move_to_end(ck)
+            self._evict_over_cap(cache)
+            OpenAIModerationEngine._CACHE = cache
+            OpenAIModerationEngine._DIRTY_KEYS.add(ck)
+        self._append_cache_entry(ck)
+
+    @staticmethod
+    def _get_client() -> Any:
+        """Return the shared OpenAI client; rebuilt only if timeout or credentials change."""
+        # Client timeout (prevents extremely long hangs)
+        timeout = _run_config().timeout
+        sig = (timeout, os.getenv("OPENAI_API_KEY"), os.getenv("OPENAI_BASE_URL"))
+        with OpenAIModerationEngine._CLIENT_LOCK:
+            if OpenAIModerationEngine._CLIENT is None or OpenAIModerationEngine._CLIENT_SIG != sig:
+                OpenAI = _import_openai()[0].OpenAI
+                OpenAIModerationEngine._CLIENT = OpenAI(timeout=timeout)
+                OpenAIModerationEngine._CLIENT_SIG = sig
+            return OpenAIModerationEngine._CLIENT
+
+    def _cache_hit(self, cache: "OrderedDict[str, Any]", ck: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for `ck` (marking it most recently used), or None."""
+        if not self._cache_enabled():
+            return None
+        # The lookup is lock-free (a single get is atomic under the GIL). move_to_end() is a
+        # write, though: it must not run while compaction iterates the cache, so it takes
+        # the lock, and only on a hit.
+        entry = cache.get(ck)
+        if entry is not None:
+            with OpenAIModerationEngine._CACHE_LOCK:
+                try:
+                    cache.move_to_end(ck)
+                except KeyError:
+                    pass  # evicted by another thread in between; the entry is still valid
+        return entry
+
+    def _cached_result(self, cached: Optional[Dict[str, Any]], start: int) -> EngineResult:
+        cached = cached or {}
+        return EngineResult(
+            name=self.name,
+            status="ok",
+            scores=cached.get("scores") or {},
+            details=cached.get("details") or {"cache_hit": True},
+            took_ms=now_ms() - start,
+        )
+
     def run(self, path: str, frames: List[Frame], max_api_frames: int = 3) -> EngineResult:
         start = now_ms()
+        # Cheap precheck: once disabled (e.g. bad key), skip without touching env/import state
+        if OpenAIModerationEngine._DISABLED_REASON:
+            return EngineResult(name=self.name, status="skipped", error=OpenAIModerationEngine._DISABLED_REASON, took_ms=now_ms() - start)
+        if not frames:
+            return EngineResult(name=self.name, status="skipped", error="no frames", took_ms=now_ms() - start)
         ok, why = self.available()
         if not ok:
             return EngineResult(name=self.name, status="skipped", error=why, took_ms=now_ms() - start)
-        if not frames:
-            return EngineResult(name=self.name, status="skipped", error="no frames", took_ms=now_ms() - start)
 
         try:
-            from openai import OpenAI
+            cfg = _run_config()
+            client = self._get_client()
 
-            # Client timeout (prevents extremely long hangs)
-            try:
-                timeout = float(os.getenv("OPENAI_REQUEST_TIMEOUT_SEC", "20"))
-            except Exception:
-                timeout = 20.0
-            client = OpenAI(timeout=timeout)
+            use_frames = self._select_frames(frames, max_api_frames)
 
-            use_n = max(1, int(max_api_frames or 1))
-            use_frames = frames[:use_n]
-
-            model_name = os.getenv("OPENAI_MODERATION_MODEL", "omni-moderation-latest")
+            model_name = cfg.model
 
             # Cache
             cache = self._load_cache()
             ck = self._cache_key(model_name, use_frames)
-            if self._cache_enabled() and ck in cache:
-                cached = cache.get(ck) or {}
+            hit = self._cache_hit(cache, ck)
+            if hit is not None:
+                return self._cached_result(hit, start)
+
+            with self._single_flight(ck) as leader:
+                hit = None if leader else self._cache_hit(cache, ck)
+                if hit is not None:
+                    # another thread just fetched the same images
+                    return self._cached_result(hit, start)
+
+                # Built once, outside the retry loop; the base64 text is memoized on the frame.
+                inputs = self._build_inputs(use_frames)
+
+                # Retry / backoff policy
+                max_retries = cfg.max_retries
+                base_sleep = cfg.base_sleep
+                max_sleep = cfg.max_sleep
+                max_total_sleep = cfg.max_total_sleep
+                policy = cfg.policy_429
+                max_429_retries = cfg.max_429_retries
+
+                total_slept = 0.0
+                last_err: Optional[Exception] = None
+
+                for attempt in range(max_retries + 1):
+                    try:
+                        self._throttle_global()
+                        resp = client.moderations.create(model=model_name, input=inputs)
+
+                        r0 = _first_result(resp)
+                        out_scores, details = self._scores_from_result(r0, use_frames)
+
+                        self._store_cache(ck, {"scores": out_scores, "details": details})
+
+                        return EngineResult(name=self.name, status="ok", scores=out_scores, details=details, took_ms=now_ms() - start)
+
+                    except Exception as e:
+                        last_err = e
+                        # Permanent auth problems: disable immediately (prevents long waits when scanning folders)
+                        msg = str(e)
+                        sc = getattr(e, "status_code", None)
+                        m = _ERR_CODE_RE.search(msg)
+                        if sc in (401, 403) or (m is not None and m.group(1) in ("401", "403")) or ("deactivated" in msg.lower()):
+                            OpenAIModerationEngine._DISABLED_REASON = "OpenAI disabled: invalid/deactivated API key (401/403). Remove OPENAI_API_KEY or set OPENAI_DISABLE=1"
+                            break
+                        # Fast handling for 429
+                        if self._is_429(e):
+                            if policy == "skip":
+                                break
+                            if attempt >= max_429_retries:
+                                break
+                            ra = self._retry_after_seconds(e)
+                            if ra is None:
+                                sleep = base_sleep * (2 ** attempt)
+                                sleep = sleep * (0.75 + random.random() * 0.5)
+                            else:
+                                sleep = ra
+                            sleep = min(float(sleep), max_sleep)
+                            # Don’t stall forever on quota exhaustion
+                            if total_slept + sleep > max_total_sleep:
+                                break
+                            time.sleep(max(0.0, sleep))
+                            total_slept += max(0.0, sleep)
+                            continue
+                        # Anything else: stop retrying
+                        break
+
+                # If we hit a permanent auth failure, expose a clean "skipped" reason.
+                if OpenAIModerationEngine._DISABLED_REASON:
+                    return EngineResult(
+                        name=self.name,
+                        status="skipped",
+                        error=OpenAIModerationEngine._DISABLED_REASON,
+                        took_ms=now_ms() - start,
+                    )
+
                 return EngineResult(
                     name=self.name,
-                    status="ok",
-                    scores=cached.get("scores") or {},
-                    details=cached.get("details") or {"cache_hit": True},
+                    status="skipped",
+                    error=f"rate/quota or error: {last_err}",
                     took_ms=now_ms() - start,
                 )
 
-            inputs: List[Dict[str, Any]] = []
-            if self.extra_text:
-                inputs.append({"type": "text", "text": self.extra_text})
-            for fr in use_frames:
-                b64 = base64.b64encode(fr.get_jpeg_bytes()).decode("ascii")
-                inputs.append({"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64}"}})
+        except Exception as e:
+            return EngineResult(name=self.name, status="error", error=str(e), took_ms=now_ms() - start)
 
-            # Retry / backoff policy
-            try:
-                max_retries = int(os.getenv("OPENAI_MAX_RETRIES", "6"))
-            except Exception:
-                max_retries = 6
-            try:
-                base_sleep = float(os.getenv("OPENAI_BACKOFF_BASE_SEC", "1.0"))
-            except Exception:
-                base_sleep = 1.0
-            try:
-                max_sleep = float(os.getenv("OPENAI_BACKOFF_MAX_SEC", "10"))
-            except Exception:
-                max_sleep = 10.0
-            try:
-                max_total_sleep = float(os.getenv("OPENAI_MAX_TOTAL_SLEEP_SEC", "30"))
-            except Exception:
-                max_total_sleep = 30.0
-            policy = os.getenv("OPENAI_429_POLICY", "retry").strip().lower()  # retry | skip
-            try:
-                max_429_retries = int(os.getenv("OPENAI_MAX_429_RETRIES", "3"))
-            except Exception:
-                max_429_retries = 3
 
-            total_slept = 0.0
-            last_err: Optional[Exception] = None
+    @staticmethod
+    def _submit_batch(client: Any, jsonl: bytes) -> Dict[str, Any]:
+        """Run one Batch API job and return {custom_id: moderation response body} for successful lines."""
+        try:
+            poll = float(os.getenv("OPENAI_BATCH_POLL_SEC", "10"))
+        except Exception:
+            poll = 10.0
+        try:
+            max_wait = float(os.getenv("OPENAI_BATCH_MAX_WAIT_SEC", "3600"))
+        except Exception:
+            max_wait = 3600.0
 
-            for attempt in range(max_retries + 1):
+        f = client.files.create(file=("moderation_batch.jsonl", jsonl), purpose="batch")
+        batch = client.batches.create(input_file_id=f.id, endpoint="/v1/moderations", completion_window="24h")
+        deadline = time.monotonic() + max_wait
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            if time.monotonic() > deadline:
                 try:
-                    self._throttle_global()
-                    resp = client.moderations.create(model=model_name, input=inputs)
-
-                    d = safe_model_dump(resp)
-                    r0 = (d.get("results") or [{}])[0]
-                    cats = (r0.get("categories") or {})
-                    scores = (r0.get("category_scores") or {})
-
-                    wanted = [
-                        "sexual",
-                        "sexual/minors",
-                        "violence",
-                        "violence/graphic",
-                        "self-harm",
-                        "self-harm/intent",
-                        "self-harm/instructions",
-                        "hate",
-                        "hate/threatening",
-                        "harassment",
-                        "harassment/threatening",
-                        "illicit",
-                        "illicit/violent",
-                    ]
-                    out_scores: Dict[str, float] = {}
-                    for k in wanted:
-                        v = scores.get(k, 0.0)
-                        try:
-                            out_scores[k] = float(v)
-                        except Exception:
-                            out_scores[k] = 0.0
-                    max_any = max(out_scores.values()) if out_scores else 0.0
-                    out_scores["max_any_category"] = float(max_any)
-                    out_scores["flagged"] = 1.0 if bool(r0.get("flagged")) else 0.0
-
-                    details = {
-                        "categories": cats,
-                        "frames_used": [f.idx for f in use_frames],
-                        "has_text": bool(self.extra_text),
-                        "category_applied_input_types": r0.get("category_applied_input_types"),
-                    }
-
-                    # Write cache
-                    if self._cache_enabled():
-                        with OpenAIModerationEngine._CACHE_LOCK:
-                            cache[ck] = {"scores": out_scores, "details": details}
-                            # Cap cache size (dict is insertion-ordered)
-                            try:
-                                cap = int(os.getenv("OPENAI_CACHE_MAX_ITEMS", "2000"))
-                            except Exception:
-                                cap = 2000
-                            if cap > 0 and len(cache) > cap:
-                                # Evict oldest
-                                for _ in range(len(cache) - cap):
-                                    try:
-                                        cache.pop(next(iter(cache)))
-                                    except Exception:
-                                        break
-                            OpenAIModerationEngine._CACHE = cache
-                        OpenAIModerationEngine._CACHE_DIRTY = True
-                        OpenAIModerationEngine._CACHE_WRITES_SINCE_FLUSH += 1
-                        if OpenAIModerationEngine._CACHE_WRITES_SINCE_FLUSH >= OpenAIModerationEngine._CACHE_FLUSH_EVERY_N:
-                            self._save_cache(force=True)
-
-                    return EngineResult(name=self.name, status="ok", scores=out_scores, details=details, took_ms=now_ms() - start)
-
-                except Exception as e:
-                    last_err = e
-                    # Permanent auth problems: disable immediately (prevents long waits when scanning folders)
-                    msg = str(e)
-                    sc = getattr(e, "status_code", None)
-                    if sc in (401, 403) or ("Error code: 401" in msg) or ("Error code: 403" in msg) or ("deactivated" in msg.lower()):
-                        OpenAIModerationEngine._DISABLED_REASON = "OpenAI disabled: invalid/deactivated API key (401/403). Remove OPENAI_API_KEY or set OPENAI_DISABLE=1"
-                        break
-                    # Fast handling for 429
-                    if self._is_429(e):
-                        if policy == "skip":
-                            break
-                        if attempt >= max_429_retries:
-                            break
-                        ra = self._retry_after_seconds(e)
-                        if ra is None:
-                            sleep = base_sleep * (2 ** attempt)
-                            sleep = sleep * (0.75 + random.random() * 0.5)
-                        else:
-                            sleep = ra
-                        sleep = min(float(sleep), max_sleep)
-                        # Don’t stall forever on quota exhaustion
-                        if total_slept + sleep > max_total_sleep:
-                            break
-                        time.sleep(max(0.0, sleep))
-                        total_slept += max(0.0, sleep)
-                        continue
-                    # Anything else: stop retrying
-                    break
+                    client.batches.cancel(batch.id)
+                except Exception:
+                    pass
+                raise TimeoutError(f"batch {batch.id} not finished after {max_wait:.0f}s")
+            time.sleep(max(0.5, poll))
+            batch = client.batches.retrieve(batch.id)
+        if batch.status != "completed" or not batch.output_file_id:
+            raise RuntimeError(f"batch {batch.id} ended with status {batch.status}")
+
+        content = client.files.content(batch.output_file_id)
+        raw = getattr(content, "content", None)
+        if raw is None:
+            raw = content.read()
+        out: Dict[str, Any] = {}
+        for line in raw.splitlines():
+            if not line.strip():
+                continue
+            rec = json_loads(line)
+            resp = rec.get("response") or {}
+            if resp.get("status_code") == 200 and isinstance(resp.get("body"), dict):
+                out[rec.get("custom_id")] = resp["body"]
+        return out
+
+    def run_batch(self, items: List[Tuple[str, List[Frame]]], max_api_frames: int = 3) -> List[EngineResult]:
+        """Moderate many (path, frames) items at once.
+
+        With OPENAI_USE_BATCH_API=1 all cache misses go into a single Batch API job
+        (no per-request throttling; results arrive asynchronously, which suits
+        offline folder scans). Otherwise, and for anything the batch could not
+        answer, this falls back to run() per item, with up to OPENAI_CONCURRENCY
+        requests in flight (still paced by the global rate limiter).
+        """
+        if os.getenv("OPENAI_USE_BATCH_API", "0").strip() != "1" or len(items) < 2:
+            return self._run_many(items, max_api_frames)
+        start = now_ms()
+        ok, why = self.available()
+        if not ok:
+            return [EngineResult(name=self.name, status="skipped", error=why, took_ms=now_ms() - start) for _ in items]
 
-            # If we hit a permanent auth failure, expose a clean "skipped" reason.
-            if OpenAIModerationEngine._DISABLED_REASON:
-                return EngineResult(
-                    name=self.name,
-                    status="skipped",
-                    error=OpenAIModerationEngine._DISABLED_REASON,
-                    took_ms=now_ms() - start,
-                )
+        results: List[Optional[EngineResult]] = [None] * len(items)
+        try:
+            client = self._get_client()
+            model_name = _run_config().model
+            cache = self._load_cache()
 
-            return EngineResult(
-                name=self.name,
-                status="skipped",
-                error=f"rate/quota or error: {last_err}",
-                took_ms=now_ms() - start,
-            )
+            pending: Dict[str, Tuple[int, List[Frame], str]] = {}
+            lines: List[bytes] = []
+            for i, (_, frs) in enumerate(items):
+                if not frs:
+                    results[i] = EngineResult(name=self.name, status="skipped", error="no frames", took_ms=now_ms() - start)
+                    continue
+                use_frames = self._select_frames(frs, max_api_frames)
+                ck = self._cache_key(model_name, use_frames)
+                hit = self._cache_hit(cache, ck)
+                if hit is not None:
+                    results[i] = self._cached_result(hit, start)
+                    continue
+                cid = f"item-{i}"
+                pending[cid] = (i, use_frames, ck)
+                lines.append(json_dumps({
+                    "custom_id": cid,
+                    "method": "POST",
+                    "url": "/v1/moderations",
+                    "body": {"model": model_name, "input": self._build_inputs(use_frames)},
+                }))
+
+            if pending:
+                bodies = self._submit_batch(client, b"\n".join(lines) + b"\n")
+                for cid, (i, use_frames, ck) in pending.items():
+                    body = bodies.get(cid)
+                    if not body:
+                        continue
+                    r0 = (body.get("results") or [{}])[0]
+                    out_scores, details = self._scores_from_result(r0, use_frames)
+                    self._store_cache(ck, {"scores": out_scores, "details": details})
+                    results[i] = EngineResult(name=self.name, status="ok", scores=out_scores, details=details, took_ms=now_ms() - start)
+        except Exception:
+            pass  # whatever is still missing is done synchronously below
 
-        except Exception as e:
-            return EngineResult(name=self.name, status="error", error=str(e), took_ms=now_ms() - start)
+        todo = [i for i, r in enumerate(results) if r is None]
+        for i, r in zip(todo, self._run_many([items[i] for i in todo], max_api_frames)):
+            results[i] = r
+        return results  # type: ignore[return-value]
 
+    def _run_many(self, items: List[Tuple[str, List[Frame]]], max_api_frames: int) -> List[EngineResult]:
+        """run() for each item, overlapping request latency on a small thread pool."""
+        try:
+            workers = int(os.getenv("OPENAI_CONCURRENCY", "1"))
+        except Exception:
+            workers = 1
+        workers = min(max(1, workers), len(items))
+        if workers <= 1:
+            return [self.run(p, frs, max_api_frames) for p, frs in items]
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            return list(ex.map(lambda it: self.run(it[0], it[1], max_api_frames), items))
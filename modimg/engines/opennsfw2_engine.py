@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 import os
-from typing import Any, List, Tuple, Optional
-from PIL import Image
+import threading
+from typing import TYPE_CHECKING, Any, List, Tuple, Optional
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 from ..types import Engine, EngineResult
 from ..utils import now_ms
@@ -14,6 +17,7 @@ class OpenNSFW2Engine(Engine):
     with older code that imports **open_nsfw2**.
     """
     name = "OpenNSFW2"
+    run_lock = threading.Lock()  # shared cached model
 
     _BACKEND = None  # (name, module)
 
@@ -50,7 +54,9 @@ class OpenNSFW2Engine(Engine):
                 return getattr(x, "pil")
             return x
 
-        im = _to_pil(frames[0]).convert("RGB")
+        im = _to_pil(frames[0])
+        if im.mode != "RGB":  # frames are loaded as RGB; avoid a full-image copy
+            im = im.convert("RGB")
 
         prob = None
         try:
@@ -40,8 +40,7 @@ class PHashBlocklistEngine(Engine):
 
         fr_first = frames[0]
         fr_last = frames[-1]
-        first_hex, first_int = ph.frame_phash_hex_int(fr_first)
-        last_hex, last_int = ph.frame_phash_hex_int(fr_last)
+        (first_hex, first_int), (last_hex, last_int) = ph.frames_phash_hex_int([fr_first, fr_last])
 
         best: Optional[tuple[int, str, str, str]] = None  # (dist, hex, label, which)
 
@@ -1,11 +1,41 @@
 from __future__ import annotations
 
 import os
-import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Optional, Tuple
 
 from ..types import Engine, EngineResult, Frame, mk_skipped
-from ..utils import now_ms
+from ..utils import json_loads, now_ms
+
+
+# Safe/non-suggestive labels ignored when scanning nudity.suggestive_classes
+_SUGG_SKIP = frozenset({
+    "none", "safe", "neutral", "other", "non_suggestive", "normal", "ok", "no_nudity",
+    "non_nudity", "clothed", "fully_clothed", "covered", "not_nude", "nonnude",
+})
+
+# nudity-2.1 intensity classes folded into nudity_raw / nudity_partial
+_INTENSITY_RAW = ("sexual_activity", "sexual_display", "erotica")
+_INTENSITY_PART = ("very_suggestive", "suggestive", "mildly_suggestive")
+
+# One keep-alive session for all calls, so frames after the first skip the TCP+TLS handshake.
+_SESSION: Any = None
+_SESSION_LOCK = threading.Lock()
+
+
+def _get_session(requests: Any) -> Any:
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+                s = requests.Session()
+                retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504), allowed_methods=frozenset({"POST"}), raise_on_status=False)
+                s.mount("https://", HTTPAdapter(pool_maxsize=8, max_retries=retry))
+                _SESSION = s
+    return _SESSION
 
 
 class SightengineEngine(Engine):
@@ -66,7 +96,7 @@ class SightengineEngine(Engine):
         self._refresh_creds()
         if not (self.api_user and self.api_secret):
             return False, "SIGHTENGINE_USER / SIGHTENGINE_SECRET not set"
-        return True, ""
+        return super().available()
 
     def run(self, path: str, frames: List[Frame], max_api_frames: int = 3) -> EngineResult:
         start = now_ms()
@@ -86,7 +116,15 @@ class SightengineEngine(Engine):
             limit = max(1, int(max_api_frames or 1))
         except Exception:
             limit = 1
-        use_frames = frames[:limit]
+        # check.json takes one media per request, so the calls can't be merged; identical
+        # frames (e.g. a static GIF) would only cost extra operations for the same answer.
+        use_frames: List[Frame] = []
+        seen = set()
+        for fr in frames[:limit]:
+            d = fr.jpeg_digest()
+            if d not in seen:
+                seen.add(d)
+                use_frames.append(fr)
         url = "https://api.sightengine.com/1.0/check.json"
 
         # credentials already refreshed in available()
@@ -126,30 +164,27 @@ class SightengineEngine(Engine):
 
                     # Intensity classes (docs): sexual_activity, sexual_display, erotica, very_suggestive, suggestive, mildly_suggestive, none
                     safe = _num(nud.get("none", nud.get("safe", 0.0)))
-                    raw = max(_num(nud.get("sexual_activity")), _num(nud.get("sexual_display")), _num(nud.get("erotica")))
-                    partial_intensity = max(_num(nud.get("very_suggestive")), _num(nud.get("suggestive")), _num(nud.get("mildly_suggestive")))
+                    raw = max(_num(nud.get(k)) for k in _INTENSITY_RAW)
+                    partial_intensity = max(_num(nud.get(k)) for k in _INTENSITY_PART)
 
                     # Suggestive classes live under nudity.suggestive_classes.* (nested dicts)
                     sugg_max = 0.0
-                    def _walk_max(obj: Any) -> None:
-                        nonlocal sugg_max
+                    stack: List[Any] = [nud.get("suggestive_classes")]
+                    while stack:
+                        obj = stack.pop()
                         if isinstance(obj, dict):
                             for kk, vv in obj.items():
-                                kl = str(kk).strip().lower()
                                 # Skip safe/non-suggestive labels often present in nested structures
-                                if kl in {"none", "safe", "neutral", "other", "non_suggestive", "normal", "ok", "no_nudity", "non_nudity", "clothed", "fully_clothed", "covered", "not_nude", "nonnude"}:
+                                if str(kk).strip().lower() in _SUGG_SKIP:
                                     continue
                                 if isinstance(vv, (int, float)):
                                     val = float(vv)
                                     if val > sugg_max:
                                         sugg_max = val
                                 else:
-                                    _walk_max(vv)
+                                    stack.append(vv)
                         elif isinstance(obj, (list, tuple)):
-                            for vv in obj:
-                                _walk_max(vv)
-
-                    _walk_max(nud.get("suggestive_classes"))
+                            stack.extend(obj)
 
                     partial = max(partial_intensity, sugg_max)
 
@@ -248,35 +283,47 @@ class SightengineEngine(Engine):
 
             return scores
 
-        best_scores: Dict[str, float] = {}
         per_frame: List[Dict[str, Any]] = []
 
-        for fr in use_frames:
+        session = _get_session(requests)
+
+        def _post(fr: Frame) -> Any:
             files = {"media": ("frame.jpg", fr.get_jpeg_bytes(), "image/jpeg")}
-            r = requests.post(url, data=params_base, files=files, timeout=60)
+            return session.post(url, data=params_base, files=files, timeout=60)
 
-            if r.status_code in (402, 403, 429):
-                self.disable(f"quota/limit http={r.status_code}")
-                return mk_skipped(self, self.disabled_reason or "quota/limit", took_ms=now_ms() - start)
+        # Frames are independent requests: upload them concurrently, then handle the
+        # responses in frame order (quota errors still stop the rest).
+        ex = ThreadPoolExecutor(max_workers=min(len(use_frames), 4))
+        try:
+            responses = [ex.submit(_post, fr) for fr in use_frames]
+            for fr, fut in zip(use_frames, responses):
+                r = fut.result()
 
-            data = r.json() if "application/json" in r.headers.get("content-type", "") else json.loads(r.text or "{}")
-            if data.get("status") != "success":
-                err = data.get("error") or data.get("message") or str(data)
-                if "quota" in str(err).lower() or "limit" in str(err).lower():
-                    self.disable(f"quota/limit: {str(err)[:200]}")
+                if r.status_code in (402, 403, 429):
+                    self.disable(f"quota/limit http={r.status_code}")
                     return mk_skipped(self, self.disabled_reason or "quota/limit", took_ms=now_ms() - start)
-                return EngineResult(name=self.name, status="error", error=str(err)[:400], details={"raw": data}, took_ms=now_ms() - start)
 
-            sc = _extract_scores(data)
-            per_frame.append({"frame": int(fr.idx), "scores": sc})
-            for k, v in sc.items():
-                if isinstance(v, (int, float)):
-                    best_scores[k] = max(float(best_scores.get(k, 0.0)), float(v))
+                data = json_loads(r.content or b"{}")
+                if data.get("status") != "success":
+                    err = data.get("error") or data.get("message") or str(data)
+                    if "quota" in str(err).lower() or "limit" in str(err).lower():
+                        self.disable(f"quota/limit: {str(err)[:200]}")
+                        return mk_skipped(self, self.disabled_reason or "quota/limit", took_ms=now_ms() - start)
+                    return EngineResult(name=self.name, status="error", error=str(err)[:400], details={"raw": data}, took_ms=now_ms() - start)
+
+                per_frame.append({"frame": int(fr.idx), "scores": _extract_scores(data)})
+        finally:
+            ex.shutdown(wait=False, cancel_futures=True)
+
+        # Per-key max over frames (missing keys count as 0), reduced once after all responses
+        frame_scores = [pf["scores"] for pf in per_frame]
+        keys = dict.fromkeys(k for sc in frame_scores for k in sc)
+        best_scores = {k: max(0.0, *(float(sc.get(k, 0.0)) for sc in frame_scores)) for k in keys}
 
         return EngineResult(
             name=self.name,
             status="ok",
-            scores={k: float(v) for k, v in best_scores.items()},
+            scores=best_scores,
             details={"per_frame": per_frame, "frames_used": [int(fr.idx) for fr in use_frames], "models": self.models},
             took_ms=now_ms() - start,
         )
@@ -1,15 +1,65 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Dict, List, Tuple
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
+import numpy as np
 
 from ..types import Engine, EngineResult, Frame
-from ..utils import env_int, now_ms, safe_float01
+from ..utils import now_ms, parse_bool, parse_int, safe_float01
 from ..config import project_root
 
 _YOLO_CACHE: Dict[Tuple[str, str], Any] = {}
 
+# Category bits per class id, derived once per loaded model from its class names
+_FIREARM, _FIREARM_TOY, _KNIFE = 1, 2, 4
+_CAT_CACHE: Dict[int, Tuple[Any, np.ndarray]] = {}
+
+
+def _class_mask(nm: str) -> int:
+    # very loose name matching for OpenImages weights
+    nm = nm.lower()
+    mask = 0
+    if "firearm" in nm or "gun" in nm or "rifle" in nm or "pistol" in nm:
+        mask |= _FIREARM
+    if "toy" in nm and ("gun" in nm or "firearm" in nm):
+        mask |= _FIREARM_TOY
+    if "knife" in nm or "dagger" in nm:
+        mask |= _KNIFE
+    return mask
+
+
+def _class_categories(mdl: Any) -> np.ndarray:
+    """Lookup array: class id -> category bitmask (0 = not a weapon class)."""
+    cached = _CAT_CACHE.get(id(mdl))
+    if cached is not None and cached[0] is mdl:
+        return cached[1]
+    names = getattr(mdl, "names", None)
+    if isinstance(names, dict):
+        items = names.items()
+    elif isinstance(names, list):
+        items = enumerate(names)
+    else:
+        items = ()
+    masks = {int(cid): _class_mask(str(nm)) for cid, nm in items}
+    lut = np.zeros(max(masks, default=-1) + 1, dtype=np.uint8)
+    for cid, mask in masks.items():
+        if cid >= 0:
+            lut[cid] = mask
+    _CAT_CACHE[id(mdl)] = (mdl, lut)
+    return lut
+
+
+def _to_numpy(t: Any) -> np.ndarray:
+    # torch tensors (possibly on GPU) or plain sequences
+    if hasattr(t, "cpu"):
+        t = t.cpu()
+    if hasattr(t, "numpy"):
+        return t.numpy()
+    return np.asarray(list(t))
+
 def _load_model() -> Any:
     backend = os.getenv("YOLO_BACKEND", "ultralytics").strip().lower()
     # Keep a simple cache key; backend kept for future
@@ -34,9 +84,42 @@ def _load_model() -> Any:
     _YOLO_CACHE[key] = mdl
     return mdl
 
+class _YoloConfig(NamedTuple):
+    conf: float
+    iou: float
+    imgsz: int
+    max_det: int
+    device: Optional[str]
+    max_frames: int
+    half: bool
+
+
+_YOLO_ENV = ("YOLO_CONF", "YOLO_IOU", "YOLO_IMGSZ", "YOLO_MAX_DET", "YOLO_DEVICE", "YOLO_MAX_FRAMES", "YOLO_HALF")
+
+
+@lru_cache(maxsize=8)
+def _parse_yolo_config(raw: Tuple[Optional[str], ...]) -> _YoloConfig:
+    conf, iou, imgsz, max_det, device, max_frames, half = raw
+    return _YoloConfig(
+        conf=float((conf or "0.25").strip() or 0.25),
+        iou=float((iou or "0.45").strip() or 0.45),
+        imgsz=parse_int(imgsz, 640),
+        max_det=parse_int(max_det, 50),
+        device=(device or "").strip() or None,
+        max_frames=parse_int(max_frames, 2),
+        half=parse_bool(half, False),
+    )
+
+
+def _yolo_config() -> _YoloConfig:
+    """Inference settings, parsed once per distinct env snapshot."""
+    return _parse_yolo_config(tuple(map(os.environ.get, _YOLO_ENV)))
+
+
 class YOLOWorldWeaponsEngine(Engine):
     """Offline weapon detection via Ultralytics YOLO weights (optional)."""
     name = "YOLO-World weapons"
+    run_lock = threading.Lock()  # shared cached model
 
     def available(self):
         try:
@@ -52,37 +135,27 @@ class YOLOWorldWeaponsEngine(Engine):
             return EngineResult(name=self.name, status="skipped", error=why, took_ms=now_ms()-start)
 
         mdl = _load_model()
-        conf = float(os.getenv("YOLO_CONF", "0.25").strip() or 0.25)
-        iou = float(os.getenv("YOLO_IOU", "0.45").strip() or 0.45)
-        imgsz = env_int("YOLO_IMGSZ", 640)
-        max_det = env_int("YOLO_MAX_DET", 50)
-        device = os.getenv("YOLO_DEVICE", "").strip() or None
-        max_frames = env_int("YOLO_MAX_FRAMES", 2)
+        cfg = _yolo_config()
+        conf, iou, imgsz, max_det, device, max_frames = cfg.conf, cfg.iou, cfg.imgsz, cfg.max_det, cfg.device, cfg.max_frames
         use = frames[:max_frames] if max_frames > 0 else frames[:1]
 
         firearm = firearm_real = firearm_toy = 0.0
         knife = knife_danger = 0.0
 
-        names = getattr(mdl, "names", None)
-
-        def _name_for(cls_id: int) -> str:
-            if isinstance(names, dict):
-                return str(names.get(int(cls_id), ""))
-            if isinstance(names, list) and 0 <= int(cls_id) < len(names):
-                return str(names[int(cls_id)])
-            return ""
+        lut = _class_categories(mdl)
 
-        for fr in use:
-            # ultralytics accepts numpy arrays / PIL
-            try:
-                res = mdl.predict(fr.pil, conf=conf, iou=iou, imgsz=imgsz, max_det=max_det, device=device, verbose=False)
-            except TypeError:
-                # older versions: imgsz named img_size etc. fallback
-                res = mdl.predict(fr.pil, conf=conf, iou=iou, max_det=max_det, device=device, verbose=False)
+        # One batched forward pass over all frames (ultralytics accepts a list of PIL images)
+        imgs = [fr.pil for fr in use]
+        extra: Dict[str, Any] = {}
+        if cfg.half:
+            extra["half"] = True  # FP16 inference; ultralytics only applies it on CUDA
+        try:
+            res = mdl.predict(imgs, conf=conf, iou=iou, imgsz=imgsz, max_det=max_det, device=device, verbose=False, **extra)
+        except TypeError:
+            # older versions: imgsz named img_size etc. fallback
+            res = mdl.predict(imgs, conf=conf, iou=iou, max_det=max_det, device=device, verbose=False)
 
-            if not res:
-                continue
-            r0 = res[0]
+        for r0 in (res or []):
             boxes = getattr(r0, "boxes", None)
             if boxes is None:
                 continue
@@ -91,25 +164,29 @@ class YOLOWorldWeaponsEngine(Engine):
             if cls_ids is None or confs is None:
                 continue
             try:
-                cls_list = cls_ids.tolist()
-                conf_list = confs.tolist()
+                cls_np = _to_numpy(cls_ids).astype(np.int64, copy=False).ravel()
+                conf_np = _to_numpy(confs).astype(np.float64, copy=False).ravel()
             except Exception:
-                cls_list = list(cls_ids)
-                conf_list = list(confs)
-
-            for cid, cprob in zip(cls_list, conf_list):
-                nm = _name_for(int(cid)).lower()
-                p = float(cprob)
-                # very loose name matching for OpenImages weights
-                if "firearm" in nm or "gun" in nm or "rifle" in nm or "pistol" in nm:
-                    firearm = max(firearm, p)
-                    firearm_real = max(firearm_real, p)
-                if "toy" in nm and ("gun" in nm or "firearm" in nm):
-                    firearm_toy = max(firearm_toy, p)
-                if "knife" in nm or "dagger" in nm:
-                    knife = max(knife, p)
-                    # dangerous-knife heuristic: treat high confidence as dangerous
-                    knife_danger = max(knife_danger, p)
+                continue
+            if not cls_np.size:
+                continue
+
+            # Vectorized: category bits per detection via the lookup array (unknown ids -> 0)
+            known = (cls_np >= 0) & (cls_np < lut.size)
+            masks = np.zeros(cls_np.shape, dtype=np.uint8)
+            masks[known] = lut[cls_np[known]]
+            gun = conf_np[(masks & _FIREARM) != 0]
+            if gun.size:
+                firearm = max(firearm, float(gun.max()))
+                firearm_real = max(firearm_real, float(gun.max()))
+            toy = conf_np[(masks & _FIREARM_TOY) != 0]
+            if toy.size:
+                firearm_toy = max(firearm_toy, float(toy.max()))
+            blade = conf_np[(masks & _KNIFE) != 0]
+            if blade.size:
+                knife = max(knife, float(blade.max()))
+                # dangerous-knife heuristic: treat high confidence as dangerous
+                knife_danger = max(knife_danger, float(blade.max()))
 
         firearm_any = max(firearm, firearm_real, firearm_toy)
 
@@ -23,10 +23,10 @@ def load_frames(path: str, sample_frames: int = 12) -> List[Frame]:
                     img.seek(idx)
                 except Exception:
                     continue
-                frame_rgb = img.convert("RGB")
+                # convert() always returns a new, fully loaded image, detached from the
+                # file, so no extra copy() is needed.
                 # Do not eagerly encode JPEG; compute lazily only if needed.
-                frames.append(Frame(idx=idx, pil=frame_rgb.copy()))
+                frames.append(Frame(idx=idx, pil=img.convert("RGB")))
         else:
-            frame_rgb = img.convert("RGB")
-            frames.append(Frame(idx=0, pil=frame_rgb.copy()))
+            frames.append(Frame(idx=0, pil=img.convert("RGB")))
     return frames
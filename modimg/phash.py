@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import os
+from functools import lru_cache
 from typing import Dict, List, Tuple, Optional
 
 import numpy as np
@@ -14,14 +15,34 @@ try:
 except Exception:
     _imagehash = None  # type: ignore
 
-_PHASH_DCT_CACHE: Dict[int, np.ndarray] = {}
+# Serializes auto-learn appends across pool workers (POSIX only; best-effort elsewhere)
+try:
+    import fcntl as _fcntl  # type: ignore
+except Exception:
+    _fcntl = None  # type: ignore
+
+try:
+    _LANCZOS = Image.Resampling.LANCZOS  # type: ignore[attr-defined]
+except Exception:
+    _LANCZOS = Image.LANCZOS  # type: ignore[attr-defined]
+
+_PHASH_DCT_CACHE: Dict[Tuple[int, int], np.ndarray] = {}
 _PHASH_LIST_CACHE: Dict[str, Tuple[float, List[Tuple[str, str, int, int]]]] = {}
 _PHASH_EXACT_CACHE: Dict[str, Tuple[float, Dict[int, Dict[int, Tuple[str, str]]]]] = {}
+# id(entries) -> (entries, {hex_len: bucket}); a bucket holds that length's entries as
+# (uint64 array or None for >64-bit hashes, [int hashes], [(hex, label)])
+_PhashBucket = Tuple[Optional[np.ndarray], List[int], List[Tuple[str, str]]]
+_PHASH_BUCKET_CACHE: Dict[int, Tuple[list, Dict[int, _PhashBucket]]] = {}
+# Below this many candidates the plain Python loop beats numpy's call overhead
+_PHASH_VECTOR_MIN = 32
 
 def project_root() -> str:
     # parent of modimg
     return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Pure function of the raw string (project_root() is fixed per install), so the hot
+# per-image callers (engines, auto-learn, list caches) share one normalization.
+@lru_cache(maxsize=64)
 def resolve_list_path(p: str) -> str:
     p = (p or "").strip()
     if not p:
@@ -30,92 +51,125 @@ def resolve_list_path(p: str) -> str:
         return p
     return os.path.join(project_root(), p)
 
+_DEFAULT_ALLOWLIST = os.path.join("data", "phash_allowlist.txt")
+_DEFAULT_BLOCKLIST = os.path.join("data", "phash_blocklist.txt")
+
 def get_allowlist_path() -> str:
-    default = os.path.join("data", "phash_allowlist.txt")
-    return resolve_list_path(os.getenv("PHASH_ALLOWLIST", default))
+    # Still reads the env each call, so a changed PHASH_ALLOWLIST is picked up.
+    return resolve_list_path(os.getenv("PHASH_ALLOWLIST", _DEFAULT_ALLOWLIST))
 
 def get_blocklist_path() -> str:
-    default = os.path.join("data", "phash_blocklist.txt")
-    return resolve_list_path(os.getenv("PHASH_BLOCKLIST", default))
+    return resolve_list_path(os.getenv("PHASH_BLOCKLIST", _DEFAULT_BLOCKLIST))
 
 def _phash_cache_invalidate(path: str) -> None:
     try:
         p = resolve_list_path(path)
     except Exception:
         p = path
-    _PHASH_LIST_CACHE.pop(p, None)
+    old = _PHASH_LIST_CACHE.pop(p, None)
+    if old is not None:
+        _PHASH_BUCKET_CACHE.pop(id(old[1]), None)
     _PHASH_EXACT_CACHE.pop(p, None)
 
-def append_phash_to_allowlist(phash_hex: str, allowlist_path: str, label: str) -> bool:
-    allowlist_path = resolve_list_path(allowlist_path)
-    phash_hex = (phash_hex or "").strip().lower()
-    if not phash_hex:
-        return False
+def _append_phashes(phash_hexes: List[str], list_path: str, label: str, default_label: str) -> int:
+    """Append the hashes not yet in the list with one open/write; returns how many were added."""
+    list_path = resolve_list_path(list_path)
+    todo: List[Tuple[str, int]] = []
+    for hx in phash_hexes:
+        hx = (hx or "").strip().lower()
+        if not hx:
+            continue
+        try:
+            todo.append((hx, int(hx, 16)))
+        except Exception:
+            continue
+    if not todo:
+        return 0
     try:
-        os.makedirs(os.path.dirname(os.path.abspath(allowlist_path)), exist_ok=True)
+        os.makedirs(os.path.dirname(os.path.abspath(list_path)), exist_ok=True)
     except Exception:
         pass
     try:
-        existing = set()
-        if os.path.exists(allowlist_path):
-            with open(allowlist_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith("#"):
-                        continue
-                    h = line.split(",", 1)[0].strip().lower()
-                    if h:
-                        existing.add(h)
-        if phash_hex in existing:
-            return False
-        with open(allowlist_path, "a", encoding="utf-8") as f:
-            f.write(f"{phash_hex},{label}\n")
-        _phash_cache_invalidate(allowlist_path)
-        return True
+        with open(list_path, "a", encoding="utf-8") as f:
+            # Hold the lock from the membership check to the write: another worker may
+            # append the same hash in between, and its lines must show up in our check.
+            if _fcntl is not None:
+                _fcntl.flock(f.fileno(), _fcntl.LOCK_EX)
+            # Membership via the mtime-cached exact map instead of re-reading the file
+            exact = load_phash_exact_map(list_path, default_label=default_label)
+            new: List[Tuple[str, int]] = []
+            seen = set()
+            for hx, iv in todo:
+                key = (len(hx), iv)
+                if key in seen or iv in exact.get(len(hx), {}):
+                    continue
+                seen.add(key)
+                new.append((hx, iv))
+            if not new:
+                return 0
+            f.write("".join(f"{hx},{label}\n" for hx, _ in new))
+            f.flush()
+            _phash_cache_add(list_path, new, label)
+        return len(new)
     except Exception:
-        return False
+        return 0
 
-def append_phash_to_blocklist(phash_hex: str, blocklist_path: str, label: str) -> bool:
-    blocklist_path = resolve_list_path(blocklist_path)
-    phash_hex = (phash_hex or "").strip().lower()
-    if not phash_hex:
-        return False
-    try:
-        os.makedirs(os.path.dirname(os.path.abspath(blocklist_path)), exist_ok=True)
-    except Exception:
-        pass
+def _append_phash(phash_hex: str, list_path: str, label: str, default_label: str) -> bool:
+    return _append_phashes([phash_hex], list_path, label, default_label) > 0
+
+def _phash_cache_add(path: str, added: List[Tuple[str, int]], label: str) -> None:
+    """Keep the caches warm after our own append: insert the entries and adopt the new mtime."""
+    cached = _PHASH_LIST_CACHE.get(path)
+    exact = _PHASH_EXACT_CACHE.get(path)
     try:
-        existing = set()
-        if os.path.exists(blocklist_path):
-            with open(blocklist_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith("#"):
-                        continue
-                    h = line.split(",", 1)[0].strip().lower()
-                    if h:
-                        existing.add(h)
-        if phash_hex in existing:
-            return False
-        with open(blocklist_path, "a", encoding="utf-8") as f:
-            f.write(f"{phash_hex},{label}\n")
-        _phash_cache_invalidate(blocklist_path)
-        return True
+        mtime = os.path.getmtime(path)
     except Exception:
-        return False
+        mtime = None
+    if mtime is None or cached is None or exact is None or cached[0] != exact[0]:
+        _phash_cache_invalidate(path)
+        return
+    entries = cached[1]
+    _PHASH_BUCKET_CACHE.pop(id(entries), None)  # vector buckets are rebuilt on next scan
+    for phash_hex, iv in added:
+        entries.append((phash_hex, label, iv, len(phash_hex)))
+        exact[1].setdefault(len(phash_hex), {})[iv] = (phash_hex, label)
+    _PHASH_LIST_CACHE[path] = (mtime, entries)
+    _PHASH_EXACT_CACHE[path] = (mtime, exact[1])
+
+def append_phash_to_allowlist(phash_hex: str, allowlist_path: str, label: str) -> bool:
+    return _append_phash(phash_hex, allowlist_path, label, default_label="allow")
+
+def append_phash_to_blocklist(phash_hex: str, blocklist_path: str, label: str) -> bool:
+    return _append_phash(phash_hex, blocklist_path, label, default_label="block")
+
+def append_phashes_to_allowlist(phash_hexes: List[str], allowlist_path: str, label: str) -> int:
+    return _append_phashes(phash_hexes, allowlist_path, label, default_label="allow")
 
-def _dct_matrix(n: int) -> np.ndarray:
-    m = _PHASH_DCT_CACHE.get(n)
+def append_phashes_to_blocklist(phash_hexes: List[str], blocklist_path: str, label: str) -> int:
+    return _append_phashes(phash_hexes, blocklist_path, label, default_label="block")
+
+def _dct_matrix(n: int, rows: int = 0) -> np.ndarray:
+    """Orthonormal DCT-II matrix; only the first `rows` frequencies if rows > 0."""
+    rows = rows if 0 < rows < n else n
+    m = _PHASH_DCT_CACHE.get((n, rows))
     if m is not None:
         return m
     x = np.arange(n, dtype=np.float32)
-    k = x.reshape((n, 1))
+    k = np.arange(rows, dtype=np.float32).reshape((rows, 1))
     mat = np.cos((np.pi * (2.0 * x + 1.0) * k) / (2.0 * n)).astype(np.float32)
     mat[0, :] *= (1.0 / np.sqrt(n))
     mat[1:, :] *= (np.sqrt(2.0 / n))
-    _PHASH_DCT_CACHE[n] = mat
+    _PHASH_DCT_CACHE[(n, rows)] = mat
     return mat
 
+def _phash_hex_from_dct(dctlow: np.ndarray, hash_size: int) -> str:
+    med = float(np.median(dctlow[1:, :])) if hash_size > 1 else float(np.median(dctlow))
+    bits = (dctlow > med).ravel()
+    # MSB-first, like shifting the bits in one by one; drop packbits' zero padding
+    val = int.from_bytes(np.packbits(bits).tobytes(), "big") >> (-bits.size % 8)
+    width = (hash_size * hash_size) // 4
+    return f"{val:0{width}x}"
+
 def phash_hex_from_pil(img: Image.Image, hash_size: int = 8, highfreq_factor: int = 4) -> str:
     if _imagehash is not None:
         try:
@@ -123,25 +177,27 @@ def phash_hex_from_pil(img: Image.Image, hash_size: int = 8, highfreq_factor: in
         except Exception:
             pass
     size = int(hash_size) * int(highfreq_factor)
-    try:
-        resample = Image.Resampling.LANCZOS  # type: ignore[attr-defined]
-    except Exception:
-        resample = Image.LANCZOS  # type: ignore[attr-defined]
-    im = img.convert("L").resize((size, size), resample=resample)
+    im = img.convert("L").resize((size, size), resample=_LANCZOS)
     pixels = np.asarray(im, dtype=np.float32)
     n = pixels.shape[0]
-    C = _dct_matrix(n)
-    dct = C @ pixels @ C.T
-    dctlow = dct[:hash_size, :hash_size]
-    med = float(np.median(dctlow[1:, :])) if hash_size > 1 else float(np.median(dctlow))
-    bits = (dctlow > med).flatten()
-    val = 0
-    for b in bits:
-        val = (val << 1) | int(bool(b))
-    width = (hash_size * hash_size) // 4
-    return f"{val:0{width}x}"
+    # Only the low-frequency corner is used, so compute just those DCT rows/columns
+    C = _dct_matrix(n, hash_size)
+    return _phash_hex_from_dct(C @ pixels @ C.T, hash_size)
+
+def phash_hex_batch(imgs: List[Image.Image], hash_size: int = 8, highfreq_factor: int = 4) -> List[str]:
+    """pHash several images with one stacked (N, size, size) DCT instead of N small ones."""
+    if _imagehash is not None or len(imgs) < 2:
+        return [phash_hex_from_pil(im, hash_size, highfreq_factor) for im in imgs]
+    size = int(hash_size) * int(highfreq_factor)
+    stack = np.stack([np.asarray(im.convert("L").resize((size, size), resample=_LANCZOS), dtype=np.float32) for im in imgs])
+    C = _dct_matrix(size, hash_size)
+    dct = C @ stack @ C.T  # matmul broadcasts over the leading frame axis
+    return [_phash_hex_from_dct(d, hash_size) for d in dct]
 
 def frame_phash_hex_int(frame: object) -> Tuple[str, int]:
+    fn = getattr(frame, "phash_hex_int", None)
+    if fn is not None:
+        return fn()  # memoized on the Frame
     hx = getattr(frame, "_phash_hex", None)
     iv = getattr(frame, "_phash_int", None)
     if hx is None or iv is None:
@@ -152,6 +208,17 @@ def frame_phash_hex_int(frame: object) -> Tuple[str, int]:
         setattr(frame, "_phash_int", iv)
     return str(hx), int(iv)
 
+def frames_phash_hex_int(frames: List[object]) -> List[Tuple[str, int]]:
+    """frame_phash_hex_int() for several frames; the missing hashes are computed in one batch."""
+    todo = []
+    for fr in frames:
+        if getattr(fr, "_phash", False) is None and not any(fr is t for t in todo):
+            todo.append(fr)
+    if len(todo) > 1:
+        for fr, hx in zip(todo, phash_hex_batch([fr.pil for fr in todo])):
+            fr._phash = (hx, int(hx, 16))  # type: ignore[attr-defined]
+    return [frame_phash_hex_int(fr) for fr in frames]
+
 def load_phash_list(path: str, default_label: str) -> List[Tuple[str, str, int, int]]:
     path = resolve_list_path(path)
     try:
@@ -163,23 +230,29 @@ def load_phash_list(path: str, default_label: str) -> List[Tuple[str, str, int,
         return cached[1]
     out: List[Tuple[str, str, int, int]] = []
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
-                parts = [p.strip() for p in line.split(",", 1)]
-                hx = parts[0].lower()
-                if not hx:
-                    continue
-                label = parts[1] if len(parts) > 1 and parts[1] else default_label
-                try:
-                    iv = int(hx, 16)
-                except Exception:
-                    continue
-                out.append((hx, label, iv, len(hx)))
+        # One bytes read + splitlines; decode only the (short) hex and label fields
+        with open(path, "rb") as f:
+            data = f.read()
+        for line in data.splitlines():
+            line = line.strip()
+            if not line or line[:1] == b"#":
+                continue
+            hb, _, lb = line.partition(b",")
+            hb = hb.strip()
+            if not hb:
+                continue
+            try:
+                iv = int(hb, 16)
+                hx = hb.decode("ascii").lower()
+            except Exception:
+                continue
+            lb = lb.strip()
+            label = lb.decode("utf-8", "replace") if lb else default_label
+            out.append((hx, label, iv, len(hx)))
     except Exception:
         out = []
+    if cached:
+        _PHASH_BUCKET_CACHE.pop(id(cached[1]), None)
     _PHASH_LIST_CACHE[path] = (mtime, out)
     return out
 
@@ -201,13 +274,57 @@ def load_phash_exact_map(path: str, default_label: str) -> Dict[int, Dict[int, T
     _PHASH_EXACT_CACHE[path] = (mtime, mp)
     return mp
 
+def _popcount64(v: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return np.bitwise_count(v)
+    # SWAR popcount for older numpy
+    v = v - ((v >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    v = (v & np.uint64(0x3333333333333333)) + ((v >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    v = (v + (v >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return (v * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+
+def _phash_buckets(entries: List[Tuple[str, str, int, int]]) -> Dict[int, _PhashBucket]:
+    """Group entries by hex length (built once per loaded list)."""
+    cached = _PHASH_BUCKET_CACHE.get(id(entries))
+    if cached is not None and cached[0] is entries:
+        return cached[1]
+    grouped: Dict[int, Tuple[List[int], List[Tuple[str, str]]]] = {}
+    for hx, label, iv, hlen in entries:
+        ivs, meta = grouped.setdefault(hlen, ([], []))
+        ivs.append(iv)
+        meta.append((hx, label))
+    buckets: Dict[int, _PhashBucket] = {
+        hlen: (np.array(ivs, dtype=np.uint64) if hlen <= 16 else None, ivs, meta)
+        for hlen, (ivs, meta) in grouped.items()
+    }
+    _PHASH_BUCKET_CACHE[id(entries)] = (entries, buckets)
+    return buckets
+
+
 def best_match_distance(phash_int: int, phash_hex_len: int, entries: List[Tuple[str, str, int, int]], max_distance: int) -> Optional[Tuple[int, str, str]]:
     """Return (dist, hex, label) for best match within max_distance."""
     best: Optional[Tuple[int, str, str]] = None
-    for hx, label, iv, hlen in entries:
-        if hlen != phash_hex_len:
-            continue
+    if len(entries) < _PHASH_VECTOR_MIN:
+        for hx, label, iv, hlen in entries:
+            if hlen != phash_hex_len:
+                continue
+            d = (phash_int ^ iv).bit_count()
+            if d <= max_distance and (best is None or d < best[0]):
+                best = (d, hx, label)
+        return best
+    bucket = _phash_buckets(entries).get(phash_hex_len)
+    if bucket is None:
+        return None
+    arr, ivs, meta = bucket
+    if arr is not None:
+        dist = _popcount64(arr ^ np.uint64(phash_int))
+        i = int(np.argmin(dist))  # first minimum, same tie-break as the loop
+        d = int(dist[i])
+        return (d, meta[i][0], meta[i][1]) if d <= max_distance else None
+    # wider than 64 bits: scan only this length's bucket in Python
+    for i, iv in enumerate(ivs):
         d = (phash_int ^ iv).bit_count()
         if d <= max_distance and (best is None or d < best[0]):
-            best = (d, hx, label)
+            best = (d, meta[i][0], meta[i][1])
     return best
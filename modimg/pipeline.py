@@ -1,17 +1,20 @@
 from __future__ import annotations
 
 import os
+import threading
 import traceback
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
 from .types import EngineResult, Verdict, Frame
-from .utils import is_url, download_url_to_temp, now_ms
+from .utils import is_url, download_url_to_temp, env_bool, env_int, now_ns
 from .frames import load_frames
 from .verdict import compute_verdict
 from .phash import (
-    append_phash_to_allowlist,
-    append_phash_to_blocklist,
-    frame_phash_hex_int,
+    append_phashes_to_allowlist,
+    append_phashes_to_blocklist,
+    frames_phash_hex_int,
     get_allowlist_path,
     get_blocklist_path,
 )
@@ -21,13 +24,39 @@ from .engines import (
     OpenAIModerationEngine, SightengineEngine,
 )
 
-def build_pre_engines(*, no_apis: bool = False) -> List[Any]:
-    """Engines that should run first and may short-circuit the entire pipeline."""
+# Env read by engine constructors; a change rebuilds the cached engine lists.
+_ENGINE_ENV = (
+    "PHASH_ALLOWLIST", "PHASH_BLOCKLIST",
+    "PHASH_ALLOW_MAX_DISTANCE", "PHASH_ALLOW_MAXDIST",
+    "PHASH_BLOCK_MAX_DISTANCE", "PHASH_MAXDIST", "PHASH_BLOCK_MAXDIST",
+    "SIGHTENGINE_MODELS",
+)
+# Engines hold only configuration (per-run state lives in locals), so one instance
+# per (no_apis, env) can be shared by every image and every engine thread.
+_PRE_ENGINES_CACHE: Dict[Any, List[Any]] = {}
+_MAIN_ENGINES_CACHE: Dict[Any, List[Any]] = {}
+_ENGINES_LOCK = threading.Lock()
+
+def _cached_engines(cache: Dict[Any, List[Any]], no_apis: bool, build: Any) -> List[Any]:
+    key = (bool(no_apis), tuple(os.getenv(k) for k in _ENGINE_ENV))
+    engines = cache.get(key)
+    if engines is None:
+        with _ENGINES_LOCK:
+            engines = cache.get(key)
+            if engines is None:
+                engines = build(no_apis)
+                # keep only the current env snapshot per no_apis
+                for k in [k for k in cache if k[0] == key[0]]:
+                    del cache[k]
+                cache[key] = engines
+    # Callers get their own list; the engine instances are shared.
+    return list(engines)
+
+def _new_pre_engines(no_apis: bool) -> List[Any]:
     # Safety: blocklist should take precedence over allowlist.
     return [PHashBlocklistEngine(), PHashAllowlistEngine()]
 
-def build_main_engines(*, no_apis: bool = False) -> List[Any]:
-    """All other engines (potentially slow/expensive)."""
+def _new_main_engines(no_apis: bool) -> List[Any]:
     engines: List[Any] = []
     engines.append(OCREngine())
     engines.append(NudeNetEngine())
@@ -38,23 +67,87 @@ def build_main_engines(*, no_apis: bool = False) -> List[Any]:
         engines.append(SightengineEngine())
     return engines
 
-def run_engines(path: str, frames: List[Frame], engines: List[Any]) -> List[EngineResult]:
-    results: List[EngineResult] = []
-    for eng in engines:
-        t0 = now_ms()
-        try:
-            ok, why = eng.available()
-            if not ok:
-                results.append(EngineResult(name=eng.name, status="skipped", error=why, took_ms=now_ms()-t0))
-                continue
+def build_pre_engines(*, no_apis: bool = False) -> List[Any]:
+    """Engines that should run first and may short-circuit the entire pipeline."""
+    return _cached_engines(_PRE_ENGINES_CACHE, no_apis, _new_pre_engines)
+
+def build_main_engines(*, no_apis: bool = False) -> List[Any]:
+    """All other engines (potentially slow/expensive)."""
+    return _cached_engines(_MAIN_ENGINES_CACHE, no_apis, _new_main_engines)
+
+def _run_one(eng: Any, path: str, frames: List[Frame]) -> EngineResult:
+    t0 = now_ns()
+    try:
+        # A quota/limit hit on the previous image must not skip this one.
+        eng.reset()
+        ok, why = eng.available()
+        if not ok:
+            return EngineResult(name=eng.name, status="skipped", error=why, took_ms=(now_ns()-t0)//1_000_000)
+        lock = getattr(eng, "run_lock", None)
+        if lock is not None:
+            with lock:
+                res = eng.run(path, frames)
+        else:
             res = eng.run(path, frames)
-            # if engine didn't set took_ms
-            if res.took_ms is None:
-                res.took_ms = now_ms()-t0
-            results.append(res)
-        except Exception as e:
-            results.append(EngineResult(name=getattr(eng, "name", "engine"), status="error", error=f"{type(e).__name__}: {e}", details={"trace": traceback.format_exc()[-2000:]}, took_ms=now_ms()-t0))
-    return results
+        # if engine didn't set took_ms
+        if res.took_ms is None:
+            res.took_ms = (now_ns()-t0)//1_000_000
+        return res
+    except Exception as e:
+        # Formatting the traceback is the expensive part of a failure; only do it on request.
+        details = {"trace": traceback.format_exc()[-2000:]} if env_bool("MODIMG_ENGINE_TRACE", False) else {}
+        return EngineResult(name=getattr(eng, "name", "engine"), status="error", error=f"{type(e).__name__}: {e}", details=details, took_ms=(now_ns()-t0)//1_000_000)
+
+# Processes running images side by side (the CLI's --workers pool sets this in each worker).
+_ENGINE_PROCESSES = 1
+
+def set_engine_processes(n: int) -> None:
+    """Tell run_engines() how many processes share the CPUs, to size its thread pool."""
+    global _ENGINE_PROCESSES
+    _ENGINE_PROCESSES = max(1, int(n))
+
+def _engine_workers(n_engines: int) -> int:
+    # MODIMG_ENGINE_WORKERS: 1 = serial, 0 = one thread per engine (max 8).
+    # Either way at most cpu_count // processes, so a --workers pool doesn't oversubscribe.
+    n = env_int("MODIMG_ENGINE_WORKERS", 0)
+    if n <= 0:
+        n = 8
+    cap = max(1, (os.cpu_count() or 1) // _ENGINE_PROCESSES)
+    return max(1, min(n, n_engines, cap))
+
+def run_engines(path: str, frames: List[Frame], engines: List[Any], *, parallel: bool = False) -> List[EngineResult]:
+    """Run engines and return their results in engine order.
+
+    With parallel=True the engines run on a thread pool: the API engines wait on the
+    network and the local models release the GIL in native code, so wall time
+    approaches the slowest engine instead of the sum.
+    """
+    workers = _engine_workers(len(engines)) if parallel else 1
+    if workers <= 1:
+        return [_run_one(eng, path, frames) for eng in engines]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="modimg-eng") as ex:
+        # map() yields in submission order, so results stay deterministic
+        return list(ex.map(lambda eng: _run_one(eng, path, frames), engines))
+
+def _prewarm_api_jpegs(frames: List[Frame], engines: List[Any], max_api_frames: int = 3) -> None:
+    """Encode the JPEGs the API engines will upload once, in parallel, before they start.
+
+    OpenAI and Sightengine both read Frame.get_jpeg_bytes() for the same leading frames;
+    running concurrently they would otherwise race to encode each frame twice.
+    """
+    use = [fr for fr in frames[:max_api_frames] if fr._jpeg_bytes is None]
+    if not use:
+        return
+    try:
+        if not any(isinstance(eng, (OpenAIModerationEngine, SightengineEngine)) and eng.available()[0] for eng in engines):
+            return
+    except Exception:
+        return
+    if len(use) == 1:
+        use[0].get_jpeg_bytes()
+        return
+    with ThreadPoolExecutor(max_workers=len(use), thread_name_prefix="modimg-jpeg") as ex:
+        list(ex.map(lambda fr: fr.get_jpeg_bytes(), use))
 
 def _short_circuit_from_phash(results: List[EngineResult]) -> Optional[Verdict]:
     # Prefer BLOCK over OK if both somehow match.
@@ -69,55 +162,85 @@ def _short_circuit_from_phash(results: List[EngineResult]) -> Optional[Verdict]:
             allow = Verdict("OK", 0.0, 0.0, 0.0, [f"Allowlist match (distance={r.details.get('distance')})"])
     return block or allow
 
+class _LearnConfig(NamedTuple):
+    enabled: bool
+    first_last: bool
+    allow_append: bool
+    block_append: bool
+    allow_label: str
+    block_label: str
+
+
+_LEARN_ENV = (
+    "PHASH_AUTO_LEARN_ENABLE",
+    "PHASH_AUTO_APPEND",
+    "PHASH_AUTO_ALLOW_APPEND",
+    "PHASH_AUTO_BLOCK_APPEND",
+    "PHASH_GIF_LEARN_FIRST_LAST",
+    "PHASH_AUTO_LABEL",
+    "PHASH_AUTO_ALLOW_LABEL",
+    "PHASH_AUTO_BLOCK_LABEL",
+)
+
+
+@lru_cache(maxsize=8)
+def _parse_learn_config(raw: Tuple[Optional[str], ...]) -> _LearnConfig:
+    enable, legacy, allow_append, block_append, first_last, label, allow_label, block_label = raw
+    # Master switch (preferred): PHASH_AUTO_LEARN_ENABLE
+    # Back-compat: older builds used PHASH_AUTO_APPEND / PHASH_AUTO_ALLOW_APPEND.
+    auto_learn = (enable or "0").strip() == "1"
+    # If the master switch is off, honor legacy flags only.
+    enabled = auto_learn or (legacy or "0").strip() == "1" or (allow_append or "0").strip() == "1"
+
+    # Defaults when PHASH_AUTO_LEARN_ENABLE=1:
+    # - OK -> allowlist append ON
+    # - BLOCK -> blocklist append ON
+    # - REVIEW -> blocklist append OFF (to avoid poisoning lists)
+    allow_append = (allow_append or "").strip()
+    block_append = (block_append or "").strip()
+    if auto_learn:
+        if allow_append == "":
+            allow_append = "1"
+        if block_append == "":
+            block_append = "1"  # only used for BLOCK (see below)
+
+    return _LearnConfig(
+        enabled=enabled,
+        first_last=(first_last or "0").strip() == "1",
+        allow_append=allow_append == "1",
+        block_append=block_append == "1",
+        allow_label=(allow_label if allow_label is not None else (label if label is not None else "ok")).strip() or "ok",
+        block_label=(block_label if block_label is not None else (label if label is not None else "not_ok")).strip() or "not_ok",
+    )
+
+
+def _learn_config() -> _LearnConfig:
+    """Auto-learn settings, parsed once per distinct env snapshot."""
+    return _parse_learn_config(tuple(map(os.environ.get, _LEARN_ENV)))
+
+
 def maybe_auto_learn(verdict: Verdict, frames: List[Frame]) -> Optional[str]:
     """Auto-append pHash to allow/block lists if enabled. Returns message or None."""
     try:
         if not frames:
             return None
-        # Master switch (preferred): PHASH_AUTO_LEARN_ENABLE
-        # Back-compat: older builds used PHASH_AUTO_APPEND / PHASH_AUTO_ALLOW_APPEND.
-        auto_learn = os.getenv("PHASH_AUTO_LEARN_ENABLE", "0").strip() == "1"
-        if not auto_learn:
-            # If the master switch is off, honor legacy flags only.
-            legacy_any = os.getenv("PHASH_AUTO_APPEND", "0").strip() == "1" or os.getenv("PHASH_AUTO_ALLOW_APPEND", "0").strip() == "1"
-            if not legacy_any:
-                return None
-        learn_first_last = os.getenv("PHASH_GIF_LEARN_FIRST_LAST", "0").strip() == "1"
+        cfg = _learn_config()
+        if not cfg.enabled:
+            return None
         # Determine hashes to append
-        frs = [frames[0], frames[-1]] if learn_first_last and len(frames) > 1 else [frames[0]]
-        hashes = []
-        for fr in frs:
-            hx, _ = frame_phash_hex_int(fr)
-            hashes.append(hx)
-
-        # Defaults when PHASH_AUTO_LEARN_ENABLE=1:
-        # - OK -> allowlist append ON
-        # - BLOCK -> blocklist append ON
-        # - REVIEW -> blocklist append OFF (to avoid poisoning lists)
-        allow_append = os.getenv("PHASH_AUTO_ALLOW_APPEND", "" ).strip()
-        block_append = os.getenv("PHASH_AUTO_BLOCK_APPEND", "" ).strip()
-        if auto_learn:
-            if allow_append == "":
-                allow_append = "1"
-            if block_append == "":
-                block_append = "1"  # only used for BLOCK (see below)
-
-        if verdict.label == "OK" and allow_append == "1":
-            label = os.getenv("PHASH_AUTO_ALLOW_LABEL", os.getenv("PHASH_AUTO_LABEL", "ok")).strip() or "ok"
+        frs = [frames[0], frames[-1]] if cfg.first_last and len(frames) > 1 else [frames[0]]
+        hashes = [hx for hx, _ in frames_phash_hex_int(frs)]
+
+        if verdict.label == "OK" and cfg.allow_append:
+            label = cfg.allow_label
             apath = get_allowlist_path()
-            added_any = False
-            for hx in hashes:
-                added_any = append_phash_to_allowlist(hx, apath, label) or added_any
-            if added_any:
+            if append_phashes_to_allowlist(hashes, apath, label):
                 return f"Auto-added pHash to allowlist ({apath})"
         # Blocklist learning is intentionally stricter: only learn from BLOCK by default.
-        if verdict.label == "BLOCK" and block_append == "1":
-            label = os.getenv("PHASH_AUTO_BLOCK_LABEL", os.getenv("PHASH_AUTO_LABEL", "not_ok")).strip() or "not_ok"
+        if verdict.label == "BLOCK" and cfg.block_append:
+            label = cfg.block_label
             bpath = get_blocklist_path()
-            added_any = False
-            for hx in hashes:
-                added_any = append_phash_to_blocklist(hx, bpath, label) or added_any
-            if added_any:
+            if append_phashes_to_blocklist(hashes, bpath, label):
                 return f"Auto-added pHash to blocklist ({bpath})"
     except Exception:
         return None
@@ -169,7 +292,9 @@ def run_on_input(inp: str, *, no_apis: bool = False, sample_frames: int = 12) ->
     else:
         # 2) Run the rest.
         main_engines = build_main_engines(no_apis=no_apis)
-        main_results = run_engines(path, frames, main_engines)
+        if not no_apis:
+            _prewarm_api_jpegs(frames, main_engines)
+        main_results = run_engines(path, frames, main_engines, parallel=True)
         results = pre_results + main_results
         v = compute_verdict(results)
 
@@ -3,9 +3,15 @@ from __future__ import annotations
 
 import dataclasses
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-from PIL import Image
+if TYPE_CHECKING:
+    from PIL import Image
+
+try:
+    import blake3  # optional, SIMD-accelerated content hashing
+except Exception:  # pragma: no cover
+    blake3 = None
 
 @dataclass
 class Frame:
@@ -14,6 +20,40 @@ class Frame:
     # Some API engines need JPEG bytes. To reduce CPU when scanning many images,
     # we compute them lazily on demand.
     _jpeg_bytes: Optional[bytes] = None
+    # base64 text per max_bytes cap (0 = uncapped)
+    _jpeg_b64: Dict[int, str] = dataclasses.field(default_factory=dict, repr=False, compare=False)
+    _jpeg_digest: Optional[bytes] = dataclasses.field(default=None, repr=False, compare=False)
+    _jpeg_sha256: Optional[bytes] = dataclasses.field(default=None, repr=False, compare=False)
+    # pHash (hex, int), shared by the allow/block engines and auto-learn.
+    _phash: Optional[Tuple[str, int]] = dataclasses.field(default=None, repr=False, compare=False)
+    # RGB uint8 arrays per max_side, shared by all engines that need numpy input.
+    _rgb: Dict[int, Any] = dataclasses.field(default_factory=dict, repr=False, compare=False)
+
+    def rgb(self, max_side: int = 0) -> Any:
+        """Return an HxWx3 uint8 array, downscaled so the longer side is <= max_side (0 = full size)."""
+        arr = self._rgb.get(max_side)
+        if arr is None:
+            import numpy as np
+            im = self.pil
+            if im.mode != "RGB":
+                im = im.convert("RGB")
+            if max_side > 0 and max(im.size) > max_side:
+                from PIL import Image as _Image
+                scale = max_side / float(max(im.size))
+                size = (max(1, round(im.width * scale)), max(1, round(im.height * scale)))
+                im = im.resize(size, _Image.Resampling.BILINEAR, reducing_gap=2.0)
+            # asarray shares PIL's buffer instead of making a second copy
+            arr = np.asarray(im, dtype=np.uint8)
+            self._rgb[max_side] = arr
+        return arr
+
+    def phash_hex_int(self) -> Tuple[str, int]:
+        """Return this frame's perceptual hash as (hex, int) (computed once)."""
+        if self._phash is None:
+            from .phash import phash_hex_from_pil
+            hx = phash_hex_from_pil(self.pil)
+            self._phash = (hx, int(hx, 16))
+        return self._phash
 
     def get_jpeg_bytes(self) -> bytes:
         """Return JPEG bytes for this frame (computed once)."""
@@ -22,6 +62,41 @@ class Frame:
             self._jpeg_bytes = pil_to_jpeg_bytes(self.pil)
         return self._jpeg_bytes
 
+    def jpeg_digest(self) -> bytes:
+        """32-byte content hash of the JPEG bytes (computed once; BLAKE3 if installed, else SHA-256)."""
+        if self._jpeg_digest is None:
+            if blake3 is not None:
+                self._jpeg_digest = blake3.blake3(self.get_jpeg_bytes()).digest()
+            else:
+                self._jpeg_digest = self.jpeg_sha256()
+        return self._jpeg_digest
+
+    def jpeg_sha256(self) -> bytes:
+        """SHA-256 of the JPEG bytes (computed once); stable across installs, for persisted keys."""
+        if self._jpeg_sha256 is None:
+            import hashlib
+            self._jpeg_sha256 = hashlib.sha256(self.get_jpeg_bytes()).digest()
+        return self._jpeg_sha256
+
+    def get_jpeg_b64(self, max_bytes: int = 0) -> str:
+        """Return the JPEG bytes base64-encoded as ASCII (computed once per cap).
+
+        If max_bytes > 0 and the JPEG is larger, a downscaled (<= 1024 px, quality 80)
+        re-encode is used instead.
+        """
+        b64 = self._jpeg_b64.get(max_bytes)
+        if b64 is None:
+            import base64
+            data = self.get_jpeg_bytes()
+            if max_bytes > 0 and len(data) > max_bytes:
+                from .utils import pil_to_jpeg_bytes
+                im = self.pil.copy()
+                im.thumbnail((1024, 1024))
+                data = min(data, pil_to_jpeg_bytes(im, quality=80), key=len)
+            b64 = base64.b64encode(data).decode("ascii")
+            self._jpeg_b64[max_bytes] = b64
+        return b64
+
 @dataclass
 class EngineResult:
     name: str
@@ -42,6 +117,9 @@ class Verdict:
 class Engine:
     """Base engine interface."""
     name: str = "engine"
+    # Engines sharing a model that isn't thread-safe set a class-level threading.Lock;
+    # run_engines() holds it around run() when engines run in parallel.
+    run_lock: Any = None
 
     def __init__(self) -> None:
         self.disabled_reason: Optional[str] = None
@@ -57,5 +135,9 @@ class Engine:
     def disable(self, why: str) -> None:
         self.disabled_reason = why
 
+    def reset(self) -> None:
+        """Clear per-image state; engine instances are reused across images."""
+        self.disabled_reason = None
+
 def mk_skipped(engine: Engine, why: str, took_ms: Optional[int] = None) -> EngineResult:
     return EngineResult(name=engine.name, status="skipped", error=why, took_ms=took_ms)
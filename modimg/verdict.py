@@ -1,14 +1,16 @@
 from __future__ import annotations
 
 import os
-from typing import List, Optional
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+import numpy as np
 
 from .types import EngineResult, Verdict
 from .utils import safe_float01
 
 
-def _env_float(name: str, default: float) -> float:
-    raw = os.getenv(name)
+def _env_float(raw: Optional[str], default: float) -> float:
     if raw is None:
         return float(default)
     try:
@@ -17,6 +19,131 @@ def _env_float(name: str, default: float) -> float:
         return float(default)
 
 
+def _env_flag(raw: Optional[str]) -> bool:
+    return (raw or "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+# Allow users to specify core engines either by display name or by a short alias.
+_ALIASES = {
+    "phash_allowlist": "pHash allowlist",
+    "phash_blocklist": "pHash blocklist",
+    "phash_allow": "pHash allowlist",
+    "phash_block": "pHash blocklist",
+    "ocr": "OCR text",
+    "openai": "OpenAI Moderation",
+    "sightengine": "Sightengine",
+}
+
+# Sensible defaults: treat only the *policy/guardrail* engines as core.
+# Offline heuristics may be optional on some machines and should not
+# force REVIEW just because a dependency is missing.
+_DEFAULT_CORE = frozenset({
+    "pHash allowlist",
+    "pHash blocklist",
+    "OCR text",
+    "OpenAI Moderation",
+    "Sightengine",
+})
+
+
+class _VerdictConfig(NamedTuple):
+    core_set: FrozenSet[str]
+    error_policy: str  # ignore | review | block
+    yolo_firearm: float
+    yolo_firearm_toy: float
+    allow_toy_gun: bool
+    yolo_dangerous_knife: float
+    yolo_knife: float
+    yolo_knife_block_all: bool
+    se_firearm: float
+    se_block_any_firearm: bool
+    se_violence: float
+    se_gore: float
+    se_offensive: float
+    se_knife: float
+    se_knife_block_all: bool
+    se_knife_context: float
+    block: float
+    review: float
+
+
+_VERDICT_ENV = (
+    "CORE_ENGINES",
+    "ENGINE_ERROR_POLICY",
+    "YOLO_FIREARM_THRESH",
+    "YOLO_FIREARM_TOY_THRESH",
+    "ALLOW_TOY_GUN",
+    "YOLO_DANGEROUS_KNIFE_THRESH",
+    "YOLO_KNIFE_THRESH",
+    "YOLO_KNIFE_BLOCK_ALL",
+    "SE_FIREARM_THRESH",
+    "SE_BLOCK_ANY_FIREARM",
+    "SE_VIOLENCE_THRESH",
+    "SE_GORE_THRESH",
+    "SE_OFFENSIVE_THRESH",
+    "SE_KNIFE_THRESH",
+    "SE_KNIFE_BLOCK_ALL",
+    "SE_KNIFE_CONTEXT_THRESH",
+    "FINAL_BLOCK_THRESHOLD",
+    "FINAL_REVIEW_THRESHOLD",
+)
+
+
+@lru_cache(maxsize=8)
+def _parse_verdict_config(raw: Tuple[Optional[str], ...]) -> _VerdictConfig:
+    (core_env, policy, y_fa, y_toy, allow_toy, y_dknife, y_knife, y_knife_all,
+     se_fa, se_any_fa, se_vio, se_gore, se_off, se_knife, se_knife_all, se_knife_ctx,
+     block_t, review_t) = raw
+
+    core_env = (core_env or "").strip()
+    if core_env:
+        core_set = frozenset(_ALIASES.get(c.lower(), c) for c in (c.strip() for c in core_env.split(",")) if c)
+    else:
+        core_set = _DEFAULT_CORE
+
+    policy = (policy or "review").strip().lower()
+    # Back-compat naming
+    if policy in ("lenient", "loose", "ignore", "open", "allow"):
+        policy = "ignore"
+    elif policy in ("block", "not_ok", "fail", "fail_closed", "deny"):
+        policy = "block"
+    else:
+        policy = "review"
+
+    return _VerdictConfig(
+        core_set=core_set,
+        error_policy=policy,
+        yolo_firearm=_env_float(y_fa, 0.35),
+        yolo_firearm_toy=_env_float(y_toy, 0.25),
+        allow_toy_gun=_env_flag(allow_toy),
+        yolo_dangerous_knife=_env_float(y_dknife, 0.35),
+        yolo_knife=_env_float(y_knife, 0.65),
+        yolo_knife_block_all=_env_flag(y_knife_all),
+        se_firearm=_env_float(se_fa, 0.35),
+        se_block_any_firearm=_env_flag(se_any_fa),
+        se_violence=_env_float(se_vio, 0.30),
+        se_gore=_env_float(se_gore, 0.20),
+        se_offensive=_env_float(se_off, 0.50),
+        se_knife=_env_float(se_knife, 0.65),
+        se_knife_block_all=_env_flag(se_knife_all),
+        se_knife_context=_env_float(se_knife_ctx, 0.25),
+        block=_env_float(block_t, 0.85),
+        review=_env_float(review_t, 0.40),
+    )
+
+
+def _verdict_config() -> _VerdictConfig:
+    """Policy settings and thresholds, parsed once per distinct env snapshot."""
+    return _parse_verdict_config(tuple(map(os.environ.get, _VERDICT_ENV)))
+
+
+def _b01(x: Any) -> float:
+    """safe_float01() with a fast path for in-range floats (what our own engines emit)."""
+    if x.__class__ is float and 0.0 <= x <= 1.0:
+        return x
+    return safe_float01(x)
+
+
 def _safe_float(value: object, default: float = 0.0) -> float:
     try:
         return float(value)
@@ -24,48 +151,209 @@ def _safe_float(value: object, default: float = 0.0) -> float:
         return float(default)
 
 
-def compute_verdict(results: List[EngineResult]) -> Verdict:
-    """
-    Conservative heuristic:
-      - BLOCK if strong nudity/porn or graphic violence/hate
-      - REVIEW for borderline (racy, mild violence)
-      - OK otherwise
-    """
+class _VerdictState:
+    """Running risk maxima and reasons, updated by the per-engine handlers."""
+    __slots__ = ("cfg", "nudity", "violence", "hate", "reasons")
+
+    def __init__(self, cfg: _VerdictConfig, nudity: float, violence: float, hate: float, reasons: List[str]) -> None:
+        self.cfg = cfg
+        self.nudity = nudity
+        self.violence = violence
+        self.hate = hate
+        self.reasons = reasons
+
+    def bump(self, current: float, value: float, reason: str, thresh: float) -> float:
+        if value >= thresh:
+            self.reasons.append(reason)
+        return max(current, value)
+
+
+# A handler reads one engine's scores into the state; returning a Verdict ends the
+# evaluation early (list matches, OCR hits, sexual/minors).
+_Handler = Callable[[_VerdictState, EngineResult, Dict[str, Any]], Optional[Verdict]]
+
+
+def _match_label(r: EngineResult) -> Optional[str]:
+    try:
+        return (r.details or {}).get("match_label") or (r.details or {}).get("matched_label")
+    except Exception:
+        return None
+
+
+def _phash_allow(st: _VerdictState, r: EngineResult, s: Dict[str, Any]) -> Optional[Verdict]:
+    if _b01(s.get("phash_allow_match", 0.0)) >= 1.0:
+        lbl = _match_label(r)
+        st.reasons.append("pHash allowlist match" + (f" ({lbl})" if lbl else ""))
+        return Verdict("OK", 0.0, 0.0, 0.0, st.reasons)
+    return None
+
+
+def _phash_block(st: _VerdictState, r: EngineResult, s: Dict[str, Any]) -> Optional[Verdict]:
+    if _b01(s.get("phash_block_match", 0.0)) >= 1.0:
+        lbl = _match_label(r)
+        st.reasons.append("pHash blocklist match" + (f" ({lbl})" if lbl else ""))
+        return Verdict("BLOCK", 1.0, 1.0, 1.0, st.reasons)
+    return None
+
+
+def _ocr(st: _VerdictState, r: EngineResult, s: Dict[str, Any]) -> Optional[Verdict]:
+    if _b01(s.get("ocr_match", 0.0)) >= 1.0:
+        st.reasons.append("OCR text blocked")
+        return Verdict("BLOCK", 1.0, 1.0, 1.0, st.reasons)
+    return None
+
+
+def _opennsfw2(st: _VerdictState, r: EngineResult, s: Dict[str, Any]) -> Optional[Verdict]:
+    n = _b01(s.get("nsfw_probability", 0.0))
+    st.nudity = st.bump(st.nudity, n, f"OpenNSFW2 NSFW={n:.2f}", 0.50)
+    return None
+
+
+def _nudenet(st: _VerdictState, r: EngineResult, s: Dict[str, Any]) -> Optional[Verdict]:
+    exposed = _b01(s.get("nudity_exposed", 0.0))
+    covered = _b01(s.get("nudity_covered", 0.0))
+    # exposed strong, covered mild
+    st.nudity = st.bump(st.nudity, exposed, f"NudeNet exposed={exposed:.2f}", 0.40)
+    st.nudity = st.bump(st.nudity, covered * 0.5, f"NudeNet covered={covered:.2f}", 0.60)
+    return None
+
+
+def _nsfwjs(st: _VerdictState, r: EngineResult, s: Dict[str, Any]) -> Optional[Verdict]:
+    n = _b01(s.get("nsfw_combined", 0.0))
+    st.nudity = st.bump(st.nudity, n, f"NSFWJS nsfw={n:.2f}", 0.50)
+    return None
+
+
+def _yolo_weapons(st: _VerdictState, r: EngineResult, s: Dict[str, Any]) -> Optional[Verdict]:
+    sf = _b01
+    cfg = st.cfg
+    realistic = sf(s.get("yolo_firearm_realistic", 0.0))
+    if realistic >= cfg.yolo_firearm:
+        st.reasons.append(f"YOLO firearm realistic={realistic:.2f}")
+        st.violence = max(st.violence, 1.0)
+
+    # Cutouts/renders often get classified as 'toy'. By default we still treat firearm-like as NOT_OK unless ALLOW_TOY_GUN=1
+    toy = sf(s.get("yolo_firearm_toy", 0.0))
+    any_firearm = sf(s.get("yolo_firearm", 0.0))
+    if (not cfg.allow_toy_gun) and (toy >= cfg.yolo_firearm_toy or any_firearm >= cfg.yolo_firearm):
+        st.reasons.append(f"YOLO firearm-like (toy/uncertain)={max(toy, any_firearm):.2f}")
+        st.violence = max(st.violence, 1.0)
+
+    danger = sf(s.get("yolo_knife_dangerous", 0.0))
+    if danger >= cfg.yolo_dangerous_knife:
+        st.reasons.append(f"YOLO dangerous knife={danger:.2f}")
+        st.violence = max(st.violence, 1.0)
+
+    knife = sf(s.get("yolo_knife", 0.0))
+    if cfg.yolo_knife_block_all and knife >= cfg.yolo_knife:
+        st.reasons.append(f"YOLO knife={knife:.2f}")
+        st.violence = max(st.violence, 1.0)
+    return None
+
+
+def _sightengine(st: _VerdictState, r: EngineResult, s: Dict[str, Any]) -> Optional[Verdict]:
+    sf = safe_float01
+    cfg = st.cfg
+    raw = sf(s.get("nudity_raw", 0.0))
+    partial = sf(s.get("nudity_partial", 0.0))
+    safe = sf(s.get("nudity_safe", 0.0))
+    # If the API reports a high 'safe/none' probability, cap partial nudity accordingly.
+    if safe > 0.0:
+        partial = min(partial, max(0.0, 1.0 - safe))
+    st.nudity = st.bump(st.nudity, raw, f"Sightengine raw nudity={raw:.2f}", 0.30)
+    partial_risk = partial * 0.6
+    # Threshold must be consistent with the weighted risk value (0.70*0.6 = 0.42)
+    st.nudity = st.bump(st.nudity, partial_risk, f"Sightengine partial nudity={partial:.2f}", 0.42)
+
+    # --- Extra Sightengine policies (weapons/violence/gore/offensive) ---
+    firearm = sf(s.get("weapon_firearm", 0.0))
+    firearm_toy = sf(s.get("weapon_firearm_toy", 0.0))
+    firearm_gesture = sf(s.get("weapon_firearm_gesture", 0.0))
+    firearm_animated = _safe_float(s.get("weapon_firearm_type_animated", 0.0))
+    realistic_firearm = firearm * (1.0 - max(firearm_toy, firearm_gesture, firearm_animated))
+    if cfg.se_block_any_firearm and firearm >= cfg.se_firearm:
+        st.reasons.append(f"Sightengine firearm(any)={firearm:.2f} (toy={firearm_toy:.2f}, gesture={firearm_gesture:.2f}, animated={firearm_animated:.2f})")
+        st.violence = max(st.violence, 1.0)
+    if realistic_firearm >= cfg.se_firearm:
+        st.reasons.append(
+            f"Sightengine firearm: realistic={realistic_firearm:.2f} (firearm={firearm:.2f}, toy={firearm_toy:.2f}, gesture={firearm_gesture:.2f}, animated={firearm_animated:.2f})"
+        )
+        st.violence = max(st.violence, 1.0)
+
+    vio_prob = sf(s.get("violence_prob", 0.0))
+    vio_phys = sf(s.get("violence_physical_violence", 0.0))
+    vio_firearm_threat = sf(s.get("violence_firearm_threat", 0.0))
+    if max(vio_prob, vio_phys, vio_firearm_threat) >= cfg.se_violence:
+        st.reasons.append(
+            f"Sightengine violence: prob={vio_prob:.2f} physical={vio_phys:.2f} firearm_threat={vio_firearm_threat:.2f}"
+        )
+        st.violence = max(st.violence, 1.0)
+
+    gore_prob = sf(s.get("gore_prob", 0.0))
+    gore_max = max(
+        gore_prob,
+        _safe_float(s.get("gore_very_bloody", 0.0)),
+        _safe_float(s.get("gore_slightly_bloody", 0.0)),
+        _safe_float(s.get("gore_serious_injury", 0.0)),
+        _safe_float(s.get("gore_superficial_injury", 0.0)),
+        _safe_float(s.get("gore_corpse", 0.0)),
+        _safe_float(s.get("gore_body_organ", 0.0)),
+    )
+    if gore_max >= cfg.se_gore:
+        st.reasons.append(f"Sightengine gore/blood: score={gore_max:.2f} (prob={gore_prob:.2f})")
+        st.violence = max(st.violence, 1.0)
+
+    offensive_max = sf(s.get("offensive_max", 0.0))
+    if offensive_max >= cfg.se_offensive:
+        st.reasons.append(f"Sightengine offensive symbols: score={offensive_max:.2f}")
+        st.hate = max(st.hate, 1.0)
+
+    knife = sf(s.get("weapon_knife", 0.0))
+    knife_ctx = max(vio_prob, vio_phys, vio_firearm_threat, gore_max)
+    if knife >= cfg.se_knife and (cfg.se_knife_block_all or knife_ctx >= cfg.se_knife_context):
+        st.reasons.append(f"Sightengine knife: score={knife:.2f} ctx={knife_ctx:.2f}")
+        st.violence = max(st.violence, 1.0)
+    return None
+
+def _openai(st: _VerdictState, r: EngineResult, s: Dict[str, Any]) -> Optional[Verdict]:
+    sf = safe_float01
+    # Sexual & violence/hate categories
+    minors = sf(s.get("sexual/minors", 0.0))
+    sexual = sf(s.get("sexual", 0.0))
+    v = max(sf(s.get("violence", 0.0)), sf(s.get("violence/graphic", 0.0)))
+    h = max(sf(s.get("hate", 0.0)), sf(s.get("hate/threatening", 0.0)))
+
+    if minors > 0.01:
+        st.reasons.append("OpenAI: sexual/minors detected")
+        return Verdict("BLOCK", 1.0, 1.0, 1.0, st.reasons)
+
+    st.nudity = st.bump(st.nudity, sexual, f"OpenAI sexual={sexual:.2f}", 0.50)
+    st.violence = st.bump(st.violence, v, f"OpenAI violence={v:.2f}", 0.50)
+    st.hate = st.bump(st.hate, h, f"OpenAI hate={h:.2f}", 0.50)
+    return None
+
+_HANDLERS: Dict[str, _Handler] = {
+    "pHash allowlist": _phash_allow,
+    "pHash blocklist": _phash_block,
+    "OCR text": _ocr,
+    "OpenNSFW2": _opennsfw2,
+    "NudeNet": _nudenet,
+    "YOLO-World weapons": _yolo_weapons,
+    "Sightengine": _sightengine,
+    "OpenAI Moderation": _openai,
+}
+
+
+def _aggregate(results: List[EngineResult], cfg: _VerdictConfig) -> Tuple[Optional[Verdict], float, float, float, List[str]]:
+    """Fold engine results into (early verdict or None, nudity, violence, hate, reasons)."""
     reasons: List[str] = []
     nudity = 0.0
     violence = 0.0
     hate = 0.0
 
-    sf = safe_float01
-
     # If any *core* engine crashed, be conservative.
     # ENGINE_ERROR_POLICY: ignore | review | block
-    # Allow users to specify core engines either by display name or by a short alias.
-    _ALIASES = {
-        "phash_allowlist": "pHash allowlist",
-        "phash_blocklist": "pHash blocklist",
-        "phash_allow": "pHash allowlist",
-        "phash_block": "pHash blocklist",
-        "ocr": "OCR text",
-        "openai": "OpenAI Moderation",
-        "sightengine": "Sightengine",
-    }
-
-    core_env = (os.getenv("CORE_ENGINES", "") or "").strip()
-    if core_env:
-        raw = [c.strip() for c in core_env.split(",") if c.strip()]
-        core_set = set(_ALIASES.get(c.lower(), c) for c in raw)
-    else:
-        # Sensible defaults: treat only the *policy/guardrail* engines as core.
-        # Offline heuristics may be optional on some machines and should not
-        # force REVIEW just because a dependency is missing.
-        core_set = {
-            "pHash allowlist",
-            "pHash blocklist",
-            "OCR text",
-            "OpenAI Moderation",
-            "Sightengine",
-        }
+    core_set = cfg.core_set
 
     err_all = [r for r in results if (r.status or "").lower() == "error"]
     err_core = [r for r in err_all if (not core_set) or (r.name in core_set)]
@@ -73,19 +361,9 @@ def compute_verdict(results: List[EngineResult]) -> Verdict:
     if err_core:
         names = ", ".join([r.name for r in err_core[:6]])
         reasons.append(f"Some checks failed: {names}")
-        policy = (os.getenv("ENGINE_ERROR_POLICY", "review") or "review").strip().lower()
-        # Back-compat naming
-        if policy in ("lenient", "loose"):
-            policy = "ignore"
-        elif policy in ("strict", "hard"):
-            policy = "review"
-        if policy in ("block", "not_ok", "fail", "fail_closed", "deny"):
-            return Verdict("BLOCK", max(nudity, 0.5), max(violence, 0.5), max(hate, 0.5), reasons)
-        if policy in ("ignore", "open", "allow"):
-            # proceed without forcing REVIEW/BLOCK
-            pass
-        else:
-            # default: REVIEW
+        if cfg.error_policy == "block":
+            return Verdict("BLOCK", max(nudity, 0.5), max(violence, 0.5), max(hate, 0.5), reasons), nudity, violence, hate, reasons
+        if cfg.error_policy == "review":
             nudity = max(nudity, 0.40)
             violence = max(violence, 0.40)
             hate = max(hate, 0.40)
@@ -100,203 +378,72 @@ def compute_verdict(results: List[EngineResult]) -> Verdict:
     if not any((r.status or "").lower() == "ok" for r in results):
         if not reasons:
             reasons.append("No checks ran (all engines skipped/disabled).")
-        return Verdict("OK", nudity, violence, hate, reasons)
-
+        return Verdict("OK", nudity, violence, hate, reasons), nudity, violence, hate, reasons
 
-    # Helpers
-    def bump(current: float, value: float, reason: str, thresh: float) -> float:
-        nonlocal reasons
-        if value >= thresh:
-            reasons.append(reason)
-        return max(current, value)
-
-    # Aggregate
+    # Aggregate: one handler per engine name (see _HANDLERS)
+    st = _VerdictState(cfg, nudity, violence, hate, reasons)
     for r in results:
         if r.status != "ok":
             continue
-        s = r.scores or {}
-        if r.name == "pHash allowlist":
-            try:
-                match = sf((r.scores or {}).get("phash_allow_match", 0.0) or 0.0)
-            except Exception:
-                match = 0.0
-            if match >= 1.0:
-                lbl = None
-                try:
-                    lbl = (r.details or {}).get("match_label") or (r.details or {}).get("matched_label")
-                except Exception:
-                    lbl = None
-                reasons.append("pHash allowlist match" + (f" ({lbl})" if lbl else ""))
-                return Verdict("OK", 0.0, 0.0, 0.0, reasons)
-
-        if r.name == "pHash blocklist":
-            match = sf(s.get("phash_block_match", 0.0))
-            if match >= 1.0:
-                lbl = None
-                try:
-                    lbl = (r.details or {}).get("match_label") or (r.details or {}).get("matched_label")
-                except Exception:
-                    lbl = None
-                reasons.append("pHash blocklist match" + (f" ({lbl})" if lbl else ""))
-                return Verdict("BLOCK", 1.0, 1.0, 1.0, reasons)
-
-        n = 0.0
-        v = 0.0
-        h = 0.0
-
-        if r.name == "OCR text":
-            try:
-                flagged = sf((r.scores or {}).get("ocr_match", 0.0) or 0.0)
-            except Exception:
-                flagged = 0.0
-            if flagged >= 1.0:
-                reasons.append("OCR text blocked")
-                return Verdict("BLOCK", 1.0, 1.0, 1.0, reasons)
-
-        if r.name == "OpenNSFW2":
-            n = sf(s.get("nsfw_probability", 0.0))
-            nudity = bump(nudity, n, f"OpenNSFW2 NSFW={n:.2f}", 0.50)
-
-        if r.name == "NudeNet":
-            exposed = sf(s.get("nudity_exposed", 0.0))
-            covered = sf(s.get("nudity_covered", 0.0))
-            # exposed strong, covered mild
-            nudity = bump(nudity, exposed, f"NudeNet exposed={exposed:.2f}", 0.40)
-            nudity = bump(nudity, covered * 0.5, f"NudeNet covered={covered:.2f}", 0.60)
-
-        if r.name.startswith("NSFWJS"):
-            n = sf(s.get("nsfw_combined", 0.0))
-            nudity = bump(nudity, n, f"NSFWJS nsfw={n:.2f}", 0.50)
-
-
-        if r.name == "YOLO-World weapons":
-            realistic = sf(s.get("yolo_firearm_realistic", 0.0))
-            y_firearm_thresh = _env_float("YOLO_FIREARM_THRESH", 0.35)
-            if realistic >= y_firearm_thresh:
-                reasons.append(f"YOLO firearm realistic={realistic:.2f}")
-                violence = max(violence, 1.0)
-
-            # Cutouts/renders often get classified as 'toy'. By default we still treat firearm-like as NOT_OK unless ALLOW_TOY_GUN=1
-            toy = sf(s.get("yolo_firearm_toy", 0.0))
-            any_firearm = sf(s.get("yolo_firearm", 0.0))
-            toy_thresh = _env_float("YOLO_FIREARM_TOY_THRESH", 0.25)
-            allow_toy = os.getenv("ALLOW_TOY_GUN", "0").strip().lower() in ("1", "true", "yes", "on")
-            if (not allow_toy) and (toy >= toy_thresh or any_firearm >= y_firearm_thresh):
-                reasons.append(f"YOLO firearm-like (toy/uncertain)={max(toy, any_firearm):.2f}")
-                violence = max(violence, 1.0)
-
-            danger = sf(s.get("yolo_knife_dangerous", 0.0))
-            y_dknife_thresh = _env_float("YOLO_DANGEROUS_KNIFE_THRESH", 0.35)
-            if danger >= y_dknife_thresh:
-                reasons.append(f"YOLO dangerous knife={danger:.2f}")
-                violence = max(violence, 1.0)
-
-            knife = sf(s.get("yolo_knife", 0.0))
-            y_knife_thresh = _env_float("YOLO_KNIFE_THRESH", 0.65)
-            knife_block_all = os.getenv("YOLO_KNIFE_BLOCK_ALL", "0").strip().lower() in ("1", "true", "yes", "on")
-            if knife_block_all and knife >= y_knife_thresh:
-                reasons.append(f"YOLO knife={knife:.2f}")
-                violence = max(violence, 1.0)
-
-        if r.name == "Sightengine":
-            raw = sf(s.get("nudity_raw", 0.0))
-            partial = sf(s.get("nudity_partial", 0.0))
-            safe = sf(s.get("nudity_safe", 0.0))
-            # If the API reports a high 'safe/none' probability, cap partial nudity accordingly.
-            if safe > 0.0:
-                partial = min(partial, max(0.0, 1.0 - safe))
-            nudity = bump(nudity, raw, f"Sightengine raw nudity={raw:.2f}", 0.30)
-            partial_risk = partial * 0.6
-            # Threshold must be consistent with the weighted risk value (0.70*0.6 = 0.42)
-            nudity = bump(nudity, partial_risk, f"Sightengine partial nudity={partial:.2f}", 0.42)
-
-            # --- Extra Sightengine policies (weapons/violence/gore/offensive) ---
-            firearm = sf(s.get("weapon_firearm", 0.0))
-            firearm_toy = sf(s.get("weapon_firearm_toy", 0.0))
-            firearm_gesture = sf(s.get("weapon_firearm_gesture", 0.0))
-            firearm_animated = _safe_float(s.get("weapon_firearm_type_animated", 0.0))
-            realistic_firearm = firearm * (1.0 - max(firearm_toy, firearm_gesture, firearm_animated))
-            se_firearm_thresh = _env_float("SE_FIREARM_THRESH", 0.35)
-            block_any_firearm = os.getenv("SE_BLOCK_ANY_FIREARM", "0").strip().lower() in ("1","true","yes","on")
-            if block_any_firearm and firearm >= se_firearm_thresh:
-                reasons.append(f"Sightengine firearm(any)={firearm:.2f} (toy={firearm_toy:.2f}, gesture={firearm_gesture:.2f}, animated={firearm_animated:.2f})")
-                violence = max(violence, 1.0)
-            if realistic_firearm >= se_firearm_thresh:
-                reasons.append(
-                    f"Sightengine firearm: realistic={realistic_firearm:.2f} (firearm={firearm:.2f}, toy={firearm_toy:.2f}, gesture={firearm_gesture:.2f}, animated={firearm_animated:.2f})"
-                )
-                violence = max(violence, 1.0)
-
-            vio_prob = sf(s.get("violence_prob", 0.0))
-            vio_phys = sf(s.get("violence_physical_violence", 0.0))
-            vio_firearm_threat = sf(s.get("violence_firearm_threat", 0.0))
-            se_violence_thresh = _env_float("SE_VIOLENCE_THRESH", 0.30)
-            if max(vio_prob, vio_phys, vio_firearm_threat) >= se_violence_thresh:
-                reasons.append(
-                    f"Sightengine violence: prob={vio_prob:.2f} physical={vio_phys:.2f} firearm_threat={vio_firearm_threat:.2f}"
-                )
-                violence = max(violence, 1.0)
-
-            gore_prob = sf(s.get("gore_prob", 0.0))
-            gore_max = max(
-                gore_prob,
-                _safe_float(s.get("gore_very_bloody", 0.0)),
-                _safe_float(s.get("gore_slightly_bloody", 0.0)),
-                _safe_float(s.get("gore_serious_injury", 0.0)),
-                _safe_float(s.get("gore_superficial_injury", 0.0)),
-                _safe_float(s.get("gore_corpse", 0.0)),
-                _safe_float(s.get("gore_body_organ", 0.0)),
-            )
-            se_gore_thresh = _env_float("SE_GORE_THRESH", 0.20)
-            if gore_max >= se_gore_thresh:
-                reasons.append(f"Sightengine gore/blood: score={gore_max:.2f} (prob={gore_prob:.2f})")
-                violence = max(violence, 1.0)
-
-            offensive_max = sf(s.get("offensive_max", 0.0))
-            se_offensive_thresh = _env_float("SE_OFFENSIVE_THRESH", 0.50)
-            if offensive_max >= se_offensive_thresh:
-                reasons.append(f"Sightengine offensive symbols: score={offensive_max:.2f}")
-                hate = max(hate, 1.0)
-
-            knife = sf(s.get("weapon_knife", 0.0))
-            se_knife_thresh = _env_float("SE_KNIFE_THRESH", 0.65)
-            knife_block_all = os.getenv("SE_KNIFE_BLOCK_ALL", "0").strip().lower() in ("1", "true", "yes", "on")
-            knife_ctx = max(vio_prob, vio_phys, vio_firearm_threat, gore_max)
-            knife_ctx_thresh = _env_float("SE_KNIFE_CONTEXT_THRESH", 0.25)
-            if knife >= se_knife_thresh and (knife_block_all or knife_ctx >= knife_ctx_thresh):
-                reasons.append(f"Sightengine knife: score={knife:.2f} ctx={knife_ctx:.2f}")
-                violence = max(violence, 1.0)
-
-
-        if r.name == "OpenAI Moderation":
-            # Sexual & violence/hate categories
-            minors = sf(s.get("sexual/minors", 0.0))
-            sexual = sf(s.get("sexual", 0.0))
-            v = max(sf(s.get("violence", 0.0)), sf(s.get("violence/graphic", 0.0)))
-            h = max(sf(s.get("hate", 0.0)), sf(s.get("hate/threatening", 0.0)))
-
-            if minors > 0.01:
-                reasons.append("OpenAI: sexual/minors detected")
-                return Verdict("BLOCK", 1.0, 1.0, 1.0, reasons)
-
-            nudity = bump(nudity, sexual, f"OpenAI sexual={sexual:.2f}", 0.50)
-            violence = bump(violence, v, f"OpenAI violence={v:.2f}", 0.50)
-            hate = bump(hate, h, f"OpenAI hate={h:.2f}", 0.50)
+        handler = _HANDLERS.get(r.name)
+        if handler is None and r.name.startswith("NSFWJS"):
+            handler = _nsfwjs
+        if handler is not None:
+            early = handler(st, r, r.scores or {})
+            if early is not None:
+                return early, st.nudity, st.violence, st.hate, reasons
+    return None, st.nudity, st.violence, st.hate, reasons
+
+
+def _finish(label: str, nudity: float, violence: float, hate: float, reasons: List[str]) -> Verdict:
+    # Ensure at least one reason for REVIEW/BLOCK
+    if label != "OK" and not reasons:
+        reasons.append("Borderline content detected by one or more engines.")
+    return Verdict(label, nudity, violence, hate, reasons)
+
+
+def compute_verdict(results: List[EngineResult]) -> Verdict:
+    """
+    Conservative heuristic:
+      - BLOCK if strong nudity/porn or graphic violence/hate
+      - REVIEW for borderline (racy, mild violence)
+      - OK otherwise
+    """
+    cfg = _verdict_config()
+    early, nudity, violence, hate, reasons = _aggregate(results, cfg)
+    if early is not None:
+        return early
 
     # Final decision thresholds (configurable via .env)
-    block_t = _env_float("FINAL_BLOCK_THRESHOLD", 0.85)
-    review_t = _env_float("FINAL_REVIEW_THRESHOLD", 0.40)
+    risk = max(nudity, violence, hate)
     label = "OK"
-    if nudity >= block_t or violence >= block_t or hate >= block_t:
+    if risk >= cfg.block:
         label = "BLOCK"
-    elif nudity >= review_t or violence >= review_t or hate >= review_t:
+    elif risk >= cfg.review:
         label = "REVIEW"
+    return _finish(label, nudity, violence, hate, reasons)
 
-    # Ensure at least one reason for REVIEW/BLOCK
-    if label != "OK" and not reasons:
-        reasons.append("Borderline content detected by one or more engines.")
 
-    return Verdict(label, nudity, violence, hate, reasons)
+def compute_verdicts(batch: List[List[EngineResult]]) -> List[Verdict]:
+    """compute_verdict() for many images (e.g. a folder run) with one config read.
+
+    The final BLOCK/REVIEW thresholding runs vectorized over an (N, 3) risk array.
+    """
+    cfg = _verdict_config()
+    out: List[Optional[Verdict]] = []
+    pending: List[Tuple[int, float, float, float, List[str]]] = []
+    for results in batch:
+        early, nudity, violence, hate, reasons = _aggregate(results, cfg)
+        if early is None:
+            pending.append((len(out), nudity, violence, hate, reasons))
+        out.append(early)
+    if pending:
+        risk = np.array([p[1:4] for p in pending], dtype=np.float64).max(axis=1)
+        block = risk >= cfg.block
+        review = ~block & (risk >= cfg.review)
+        for (i, nudity, violence, hate, reasons), b, r in zip(pending, block.tolist(), review.tolist()):
+            out[i] = _finish("BLOCK" if b else ("REVIEW" if r else "OK"), nudity, violence, hate, reasons)
+    return out  # type: ignore[return-value]
 
 # -----------------------------
 # Runner
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import pytest
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _warm_imports() -> None:
+    """Import the CLI and pipeline once up front; every in-process test reuses them."""
+    import modimg.cli  # noqa: F401
+    import modimg.pipeline  # noqa: F401
+
+
+@pytest.fixture(scope="session")
+def sample_png(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """A small solid-colour PNG, encoded once per test session."""
+    from PIL import Image
+
+    path = tmp_path_factory.mktemp("img") / "sample.png"
+    Image.new("RGB", (16, 16), color=(10, 20, 30)).save(path)
+    return path
+
+
+@pytest.fixture(scope="session")
+def run_cli() -> Callable[..., subprocess.CompletedProcess]:
+    """Run the CLI in a fresh interpreter; identical invocations are run once per session.
+
+    ``run_cli(args)`` runs ``moderate_image.py``; ``module=True`` runs ``python -m modimg``.
+    Output is left as bytes (the tests only look for ASCII markers).
+    """
+    cache: Dict[Tuple[bool, Tuple[str, ...], Tuple[Tuple[str, str], ...]], subprocess.CompletedProcess] = {}
+
+    def run(args: Sequence[str], env_overrides: Optional[Dict[str, str]] = None, *, module: bool = False) -> subprocess.CompletedProcess:
+        key = (module, tuple(args), tuple(sorted((env_overrides or {}).items())))
+        proc = cache.get(key)
+        if proc is None:
+            env = os.environ.copy()
+            env.update(env_overrides or {})
+            entry = ["-m", "modimg"] if module else ["moderate_image.py"]
+            proc = subprocess.run(
+                [sys.executable, *entry, *args],
+                check=False,
+                capture_output=True,
+                env=env,
+            )
+            cache[key] = proc
+        return proc
+
+    return run
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from modimg.config import load_dotenv
+
+
+def test_load_dotenv_parses_prefixes_quotes_and_comments(tmp_path: Path, monkeypatch) -> None:
+    env_file = tmp_path / ".env"
+    env_file.write_text(
+        "\ufeff# comment line\n"
+        "MODIMG_T_PLAIN=1\n"
+        "export MODIMG_T_EXPORT=two\n"
+        "set MODIMG_T_SET = \"quoted value\" # trailing\n"
+        "MODIMG_T_HASH=a#b\n"
+        "MODIMG_T_INLINE=val # comment\n"
+        "MODIMG_T_PLAIN=ignored duplicate\n"
+        "not a pair\n",
+        encoding="utf-8",
+    )
+    # load_dotenv() writes keys monkeypatch never saw; give it a throwaway environ so
+    # they don't leak into later tests.
+    monkeypatch.setattr(os, "environ", os.environ.copy())
+    for k in ("MODIMG_T_PLAIN", "MODIMG_T_EXPORT", "MODIMG_T_SET", "MODIMG_T_HASH", "MODIMG_T_INLINE"):
+        monkeypatch.delenv(k, raising=False)
+
+    loaded = load_dotenv(str(env_file), override=False)
+
+    assert sorted(loaded) == sorted(["MODIMG_T_PLAIN", "MODIMG_T_EXPORT", "MODIMG_T_SET", "MODIMG_T_HASH", "MODIMG_T_INLINE"])
+    assert os.environ["MODIMG_T_PLAIN"] == "1"
+    assert os.environ["MODIMG_T_EXPORT"] == "two"
+    assert os.environ["MODIMG_T_SET"] == "quoted value"
+    assert os.environ["MODIMG_T_HASH"] == "a#b"
+    assert os.environ["MODIMG_T_INLINE"] == "val"
+
+
+def test_load_dotenv_respects_existing_env_unless_override(tmp_path: Path, monkeypatch) -> None:
+    env_file = tmp_path / ".env"
+    env_file.write_text("MODIMG_T_KEEP=from_file\n", encoding="utf-8")
+    monkeypatch.setenv("MODIMG_T_KEEP", "from_shell")
+
+    assert load_dotenv(str(env_file), override=False) == []
+    assert os.environ["MODIMG_T_KEEP"] == "from_shell"
+
+    assert load_dotenv(str(env_file), override=True) == ["MODIMG_T_KEEP"]
+    assert os.environ["MODIMG_T_KEEP"] == "from_file"
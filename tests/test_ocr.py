@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import random
+import re
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+from modimg.engines.ocr import OCREngine
+
+
+@pytest.fixture(autouse=True)
+def _restore_pattern_cache(monkeypatch):
+    monkeypatch.setattr(OCREngine, "_CACHE", OCREngine._CACHE)
+
+
+def _load(tmp_path: Path, lines: List[str]) -> List[re.Pattern]:
+    p = tmp_path / "ocr_text_blocklist.txt"
+    p.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    eng = OCREngine()
+    eng.blocklist_path = str(p)
+    OCREngine._CACHE = (0.0, [], [], [], None)
+    return eng._load_patterns()
+
+
+def _first_match(joined: str, patterns: List[re.Pattern]) -> Optional[str]:
+    for pat in patterns:
+        if pat.search(joined):
+            return pat.pattern
+    return None
+
+
+@pytest.mark.parametrize(
+    "lines, text, hit",
+    [
+        # file order wins over literal-vs-regex and over position in the text
+        (["nazi.*flag", "swastika"], "a swastika and nazi flag", "nazi.*flag"),
+        (["swastika", "nazi.*flag"], "a nazi flag and swastika", "swastika"),
+        # IGNORECASE semantics beyond ASCII lower()
+        (["Σ"], "ς", "Σ"),
+        (["kiss"], "Kiss", "kiss"),
+        # a line that isn't a valid regex is matched literally and reported escaped
+        (["foo(bar"], "x FOO(bar y", re.escape("foo(bar")),
+        (["a", "b"], "nothing here", None),
+    ],
+)
+def test_find_hit_reports_first_line_in_file_order(tmp_path: Path, lines, text, hit) -> None:
+    patterns = _load(tmp_path, lines)
+    assert OCREngine._find_hit(text, patterns) == hit
+
+
+def test_find_hit_matches_plain_scan(tmp_path: Path) -> None:
+    rng = random.Random(7)
+    words = ["gun", "hate", "kill", "Nazi", "ß", "Σ", "x(", "k.ll", "h[a4]te", "^start", "end$"]
+    texts = ["a gun and hate", "KILL the nazi", "kíll", "straße", "ς", "x( y", "k ll kill", "start end", "nothing"]
+    for _ in range(200):
+        lines = rng.sample(words, rng.randint(1, len(words)))
+        patterns = _load(tmp_path, lines)
+        for text in texts:
+            assert OCREngine._find_hit(text, patterns) == _first_match(text, patterns)
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import os
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+from PIL import Image
+
+from modimg.types import Frame
+from modimg.utils import json_dumps, json_loads
+
+
+@pytest.fixture
+def openai_engine(monkeypatch, tmp_path):
+    """An available OpenAIModerationEngine with fresh class state and a cache file under tmp_path."""
+    from modimg.engines import openai_mod
+
+    eng_cls = openai_mod.OpenAIModerationEngine
+    monkeypatch.setenv("OPENAI_DISABLE", "0")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("OPENAI_CACHE_ENABLE", "1")
+    monkeypatch.setenv("OPENAI_CACHE_PATH", str(tmp_path / "openai_cache.json"))
+    monkeypatch.setenv("OPENAI_MIN_INTERVAL_SEC", "0")
+    monkeypatch.setattr(openai_mod, "_import_openai", lambda: (object(), ""))
+    for attr, value in (
+        ("_CACHE", None),
+        ("_CACHE_PATH", None),
+        ("_CACHE_DIR_READY", False),
+        ("_CACHE_LOG_LINES", 0),
+        ("_DIRTY_KEYS", set()),
+        ("_AVAILABLE_CACHE", None),
+        ("_DISABLED_REASON", None),
+        ("_GLOBAL_TAT_MONO", 0.0),
+        # no writer thread / atexit hook: tests flush with _drain_writes()
+        ("_WRITER_PID", os.getpid()),
+        ("_ATEXIT_REGISTERED", True),
+    ):
+        monkeypatch.setattr(eng_cls, attr, value)
+    return eng_cls()
+
+
+def _frames(color: int) -> List[Frame]:
+    return [Frame(idx=0, pil=Image.new("RGB", (16, 16), color=(color, 0, 0)))]
+
+
+def _moderation(sexual: float) -> Any:
+    r = SimpleNamespace(categories={"sexual": sexual > 0.5}, category_scores={"sexual": sexual}, flagged=sexual > 0.5, category_applied_input_types=None)
+    return SimpleNamespace(results=[r])
+
+
+class _FakeClient:
+    """Batch API + moderations stand-in; batch lines listed in `batch_answers` get that score."""
+
+    def __init__(self, batch_answers: Dict[str, float], sync_score: float = 0.9) -> None:
+        self.batch_answers = batch_answers
+        self.sync_score = sync_score
+        self.sync_calls = 0
+        self.submitted: List[Dict[str, Any]] = []
+        self.files = SimpleNamespace(create=self._file_create, content=self._file_content)
+        self.batches = SimpleNamespace(create=self._batch_create, retrieve=None, cancel=None)
+        self.moderations = SimpleNamespace(create=self._moderate)
+
+    def _file_create(self, file, purpose):
+        self.submitted = [json_loads(line) for line in file[1].splitlines() if line.strip()]
+        return SimpleNamespace(id="file-in")
+
+    def _batch_create(self, input_file_id, endpoint, completion_window):
+        return SimpleNamespace(id="batch-1", status="completed", output_file_id="file-out")
+
+    def _file_content(self, file_id):
+        # Output lines come back in a different order than submitted.
+        out = [
+            {
+                "custom_id": rec["custom_id"],
+                "response": {"status_code": 200, "body": {"results": [{"category_scores": {"sexual": self.batch_answers[rec["custom_id"]]}}]}},
+            }
+            for rec in reversed(self.submitted)
+            if rec["custom_id"] in self.batch_answers
+        ]
+        return SimpleNamespace(content=b"\n".join(map(json_dumps, out)))
+
+    def _moderate(self, model, input):
+        self.sync_calls += 1
+        return _moderation(self.sync_score)
+
+
+def test_run_batch_maps_custom_ids_and_falls_back_to_run(openai_engine, monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_USE_BATCH_API", "1")
+    client = _FakeClient({"item-0": 0.1, "item-2": 0.3})
+    monkeypatch.setattr(type(openai_engine), "_get_client", staticmethod(lambda: client))
+
+    items = [(f"{i}.png", _frames(40 * i)) for i in range(3)]
+    results = openai_engine.run_batch(items)
+
+    assert [rec["custom_id"] for rec in client.submitted] == ["item-0", "item-1", "item-2"]
+    assert [r.status for r in results] == ["ok", "ok", "ok"]
+    # item-1 was missing from the batch output and went through run() instead
+    assert [r.scores["sexual"] for r in results] == [0.1, 0.9, 0.3]
+    assert client.sync_calls == 1
+
+
+def test_concurrent_requests_respect_gcra_pacing(openai_engine, monkeypatch) -> None:
+    import threading
+    import time
+
+    interval = 0.05
+    monkeypatch.setenv("OPENAI_USE_BATCH_API", "0")
+    monkeypatch.setenv("OPENAI_CONCURRENCY", "4")
+    monkeypatch.setenv("OPENAI_MIN_INTERVAL_SEC", str(interval))
+    monkeypatch.setenv("OPENAI_BURST", "1")
+
+    lock = threading.Lock()
+    sent: List[float] = []
+    in_flight = [0, 0]  # current, max
+
+    def moderate(model, input):
+        with lock:
+            sent.append(time.monotonic())
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        time.sleep(3 * interval)
+        with lock:
+            in_flight[0] -= 1
+        return _moderation(0.1)
+
+    client = SimpleNamespace(moderations=SimpleNamespace(create=moderate))
+    monkeypatch.setattr(type(openai_engine), "_get_client", staticmethod(lambda: client))
+
+    results = openai_engine.run_batch([(f"{i}.png", _frames(30 * i)) for i in range(6)])
+
+    assert [r.status for r in results] == ["ok"] * 6
+    assert in_flight[1] > 1  # requests overlapped...
+    sent.sort()
+    gaps = [b - a for a, b in zip(sent, sent[1:])]
+    assert min(gaps) >= interval * 0.9  # ...but still went out one per interval
+
+
+def _entry(sexual: float) -> Dict[str, Any]:
+    return {"scores": {"sexual": sexual}, "details": {"frames_used": [0]}}
+
+
+def _reload(eng) -> Any:
+    """Drop the in-memory cache so the next _load_cache() replays the log file."""
+    type(eng)._CACHE = None
+    return eng._load_cache()
+
+
+def test_cache_store_flush_replay_round_trip(openai_engine) -> None:
+    openai_engine._store_cache("a", _entry(0.25))
+    openai_engine._store_cache("b", _entry(0.75))
+    openai_engine._drain_writes()
+
+    cache = _reload(openai_engine)
+    assert list(cache) == ["a", "b"]
+    assert cache["a"]["scores"]["sexual"] == 0.25
+    assert cache["b"]["scores"]["sexual"] == 0.75
+    assert cache["b"]["details"] == {"frames_used": [0]}
+    assert type(openai_engine)._CACHE_LOG_LINES == 2
+
+
+def test_cache_loads_legacy_formats(openai_engine) -> None:
+    path = openai_engine._cache_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, "wb") as f:
+        f.write(json_dumps({"k": "x", "v": _entry(0.5)}) + b"\n" + json_dumps({"k": "y", "v": _entry(0.6)}) + b"\n")
+    cache = _reload(openai_engine)
+    assert list(cache) == ["x", "y"]
+    assert cache["y"]["scores"]["sexual"] == 0.6
+
+    with open(path, "wb") as f:
+        f.write(json_dumps({"old1": _entry(0.1), "old2": _entry(0.2)}))
+    cache = _reload(openai_engine)
+    assert cache["old1"]["scores"]["sexual"] == 0.1
+    assert cache["old2"]["scores"]["sexual"] == 0.2
+
+
+def test_cache_compaction_keeps_only_live_entries(openai_engine, monkeypatch) -> None:
+    eng_cls = type(openai_engine)
+    monkeypatch.setenv("OPENAI_CACHE_MAX_ITEMS", "50")
+    min_lines = eng_cls._CACHE_COMPACT_MIN_LINES
+
+    # Rewriting the same 50 keys grows the log past max(200, 2 x live) lines.
+    written = 0
+    while written <= min_lines:
+        for i in range(50):
+            openai_engine._store_cache(f"k{i}", _entry(written / 1000))
+            written += 1
+        openai_engine._drain_writes()
+        if written <= min_lines:
+            assert eng_cls._CACHE_LOG_LINES == written  # below the threshold: append only
+
+    assert eng_cls._CACHE_LOG_LINES == 50
+    with open(openai_engine._cache_path(), "rb") as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 50
+    cache = _reload(openai_engine)
+    assert list(cache) == [f"k{i}" for i in range(50)]
+    assert cache["k49"]["scores"]["sexual"] == (written - 1) / 1000
+
+
+def test_cache_lru_order_survives_replay(openai_engine, monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_CACHE_MAX_ITEMS", "3")
+    for ck in ("a", "b", "c"):
+        openai_engine._store_cache(ck, _entry(0.1))
+    openai_engine._store_cache("a", _entry(0.2))  # "a" is now the most recently used
+    openai_engine._drain_writes()
+
+    cache = _reload(openai_engine)
+    assert list(cache) == ["b", "c", "a"]
+
+    openai_engine._store_cache("d", _entry(0.3))  # evicts the least recently used: "b"
+    openai_engine._drain_writes()
+    cache = _reload(openai_engine)
+    assert list(cache) == ["c", "a", "d"]
+    assert cache["a"]["scores"]["sexual"] == 0.2
+
+
+def test_cache_key_does_not_depend_on_blake3(openai_engine, monkeypatch) -> None:
+    import hashlib
+
+    from modimg import types
+
+    monkeypatch.setattr(types, "blake3", None)
+    key_sha = openai_engine._cache_key("m", _frames(7))
+
+    fake_blake3 = SimpleNamespace(blake3=lambda b: SimpleNamespace(digest=lambda: hashlib.md5(b).digest() * 2))
+    monkeypatch.setattr(types, "blake3", fake_blake3)
+    frames = _frames(7)
+    assert frames[0].jpeg_digest() != frames[0].jpeg_sha256()
+    assert openai_engine._cache_key("m", frames) == key_sha
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import random
+
+import numpy as np
+from PIL import Image
+
+from modimg import phash
+
+
+def _noise_image(rng: random.Random, size: int) -> Image.Image:
+    arr = np.frombuffer(rng.randbytes(size * size * 3), dtype=np.uint8).reshape(size, size, 3)
+    return Image.fromarray(arr, "RGB")
+
+
+def test_phash_hex_batch_matches_single_image_dct(monkeypatch) -> None:
+    # ImageHash is a runtime requirement; force the numpy DCT the batch path stacks.
+    monkeypatch.setattr(phash, "_imagehash", None)
+    rng = random.Random(5)
+    imgs = [_noise_image(rng, rng.choice([8, 31, 64, 200])) for _ in range(12)]
+    imgs.append(Image.new("RGB", (40, 40), color=(9, 9, 9)))  # flat: all-zero AC terms
+
+    for hash_size in (8, 16):
+        batch = phash.phash_hex_batch(imgs, hash_size=hash_size)
+        assert batch == [phash.phash_hex_from_pil(im, hash_size=hash_size) for im in imgs]
+        assert all(len(hx) == hash_size * hash_size // 4 for hx in batch)
+
+
+def _brute_force(phash_int, hex_len, entries, max_distance):
+    best = None
+    for hx, label, iv, hlen in entries:
+        if hlen != hex_len:
+            continue
+        d = (phash_int ^ iv).bit_count()
+        if d <= max_distance and (best is None or d < best[0]):
+            best = (d, hx, label)
+    return best
+
+
+def _entry(iv: int, hex_len: int, label: str):
+    hx = f"{iv:0{hex_len}x}"
+    return (hx, label, iv, hex_len)
+
+
+def test_best_match_distance_vectorized_matches_loop() -> None:
+    rng = random.Random(11)
+    for _ in range(300):
+        entries = []
+        for _ in range(rng.randint(phash._PHASH_VECTOR_MIN, 120)):
+            hex_len = rng.choice([16, 16, 16, 8, 64])  # mixed lengths, incl. >64-bit hashes
+            iv = rng.getrandbits(hex_len * 4)
+            entries.append(_entry(iv, hex_len, f"l{len(entries)}"))
+        probe_len = rng.choice([16, 8, 64])
+        same_len = [e for e in entries if e[3] == probe_len]
+        if same_len and rng.random() < 0.7:
+            # near-duplicate of a listed hash, plus an identical hash under another label (tie)
+            base = rng.choice(same_len)
+            probe = base[2] ^ (1 << rng.randrange(probe_len * 4))
+            entries.append(_entry(base[2], probe_len, "tie"))
+        else:
+            probe = rng.getrandbits(probe_len * 4)
+        max_distance = rng.choice([0, 1, 5, 12, 30, 256])
+        phash._PHASH_BUCKET_CACHE.clear()
+        assert phash.best_match_distance(probe, probe_len, entries, max_distance) == _brute_force(probe, probe_len, entries, max_distance)
+
+
+def test_best_match_distance_tie_break_and_cutoff() -> None:
+    entries = [_entry((2**64 - 1) ^ i, 16, f"filler{i}") for i in range(1, 40)]  # >= 58 bits away from 0
+    entries += [_entry(0b11, 16, "first"), _entry(0b101, 16, "second"), _entry(0xFF, 16, "far")]
+    # both "first" and "second" are 2 bits away: the earlier entry wins, as in the loop
+    assert phash.best_match_distance(0, 16, entries, 10) == (2, f"{0b11:016x}", "first")
+    assert phash.best_match_distance(0, 16, entries, 2) == (2, f"{0b11:016x}", "first")
+    assert phash.best_match_distance(0, 16, entries, 1) is None  # cutoff is inclusive
+    assert phash.best_match_distance(0, 8, entries, 64) is None  # no entries of that length
+
+
+def test_popcount64_swar_fallback(monkeypatch) -> None:
+    rng = random.Random(2)
+    vals = np.array([0, 1, 2**64 - 1, 2**63] + [rng.getrandbits(64) for _ in range(200)], dtype=np.uint64)
+    expected = [int(v).bit_count() for v in vals.tolist()]
+    assert phash._popcount64(vals).tolist() == expected
+    monkeypatch.delattr(np, "bitwise_count", raising=False)  # numpy < 2.0 path
+    assert phash._popcount64(vals).tolist() == expected
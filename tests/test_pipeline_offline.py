@@ -1,25 +1,68 @@
 from __future__ import annotations
 
-import subprocess
-import sys
 from pathlib import Path
 
 from PIL import Image
 
 
-def test_offline_no_apis_with_generated_image(tmp_path: Path) -> None:
+def test_offline_no_apis_with_generated_image(tmp_path: Path, run_cli) -> None:
     img_path = tmp_path / "sample.png"
     Image.new("RGB", (24, 24), color=(120, 80, 200)).save(img_path)
 
-    proc = subprocess.run(
-        [sys.executable, "moderate_image.py", str(img_path), "--no-apis"],
-        check=False,
-        capture_output=True,
-        text=True,
-    )
+    proc = run_cli([str(img_path), "--no-apis"])
 
-    combined = f"{proc.stdout}\n{proc.stderr}"
+    combined = proc.stdout + b"\n" + proc.stderr
     assert proc.returncode in (0, 2)
-    assert "Traceback (most recent call last)" not in combined
-    assert "FINAL:" in combined
-    assert "[" in combined and "]" in combined
+    assert b"Traceback (most recent call last)" not in combined
+    assert b"FINAL:" in combined
+    assert b"[" in combined and b"]" in combined
+
+
+def test_sightengine_rate_limit_does_not_skip_next_image(monkeypatch) -> None:
+    from modimg.engines import sightengine
+    from modimg.pipeline import run_engines
+    from modimg.types import Frame
+
+    class _Resp:
+        def __init__(self, status_code: int, content: bytes) -> None:
+            self.status_code = status_code
+            self.content = content
+
+    class _Session:
+        def __init__(self) -> None:
+            self.calls = 0
+
+        def post(self, *args, **kwargs):
+            self.calls += 1
+            if self.calls == 1:
+                return _Resp(429, b"")
+            return _Resp(200, b'{"status": "success", "nudity": {"sexual_activity": 0.9}}')
+
+    session = _Session()
+    monkeypatch.setenv("SIGHTENGINE_USER", "u")
+    monkeypatch.setenv("SIGHTENGINE_SECRET", "s")
+    monkeypatch.setattr(sightengine, "_get_session", lambda requests: session)
+
+    eng = sightengine.SightengineEngine()
+    frames = [Frame(idx=0, pil=Image.new("RGB", (8, 8)))]
+
+    first = run_engines("a.png", frames, [eng])[0]
+    assert first.status == "skipped" and "429" in (first.error or "")
+
+    second = run_engines("b.png", frames, [eng])[0]
+    assert second.status == "ok"
+    assert session.calls == 2
+
+
+def test_engine_threads_are_capped_per_pool_worker(monkeypatch) -> None:
+    from modimg import pipeline
+
+    monkeypatch.setattr(pipeline, "_ENGINE_PROCESSES", 1)
+    monkeypatch.setattr(pipeline.os, "cpu_count", lambda: 8)
+    monkeypatch.setenv("MODIMG_ENGINE_WORKERS", "0")
+    assert pipeline._engine_workers(6) == 6
+
+    pipeline.set_engine_processes(4)  # --workers 4
+    assert pipeline._engine_workers(6) == 2
+    pipeline.set_engine_processes(16)
+    assert pipeline._engine_workers(6) == 1
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import random
+from typing import List
+
+import pytest
+
+from modimg.types import EngineResult
+from modimg.verdict import _VERDICT_ENV, compute_verdict, compute_verdicts
+
+
+@pytest.fixture(autouse=True)
+def _default_verdict_env(monkeypatch) -> None:
+    """Built-in thresholds and policies, whatever .env set."""
+    for k in _VERDICT_ENV:
+        monkeypatch.delenv(k, raising=False)
+
+
+def _random_results(rng: random.Random) -> List[EngineResult]:
+    engines = {
+        "OpenNSFW2": ["nsfw_probability"],
+        "NudeNet": ["nudity_exposed", "nudity_covered"],
+        "OpenAI Moderation": ["sexual", "violence", "hate", "sexual/minors"],
+        "Sightengine": ["nudity_raw", "nudity_partial", "nudity_safe", "offensive_max", "gore_prob"],
+        "pHash allowlist": ["phash_allow_match"],
+        "OCR text": ["ocr_match"],
+    }
+    out = []
+    for name in rng.sample(sorted(engines), rng.randint(0, len(engines))):
+        status = rng.choice(["ok", "ok", "ok", "skipped", "error"])
+        scores = {k: rng.choice([0.0, 0.005, 0.3, 0.45, 0.6, 0.9, 1.0, 1.4]) for k in engines[name] if rng.random() < 0.6}
+        out.append(EngineResult(name=name, status=status, scores=scores if status == "ok" else {}))
+    return out
+
+
+def test_compute_verdicts_matches_compute_verdict() -> None:
+    rng = random.Random(3)
+    batch = [_random_results(rng) for _ in range(500)]
+    assert compute_verdicts(batch) == [compute_verdict(r) for r in batch]
+    assert compute_verdicts([]) == []
+
+
+def _ok(name: str, **scores) -> EngineResult:
+    return EngineResult(name=name, status="ok", scores=scores)
+
+
+_CASES = [
+    # pHash short-circuit (blocklist before allowlist, as the pipeline orders them)
+    ("phash allow", [EngineResult("pHash allowlist", "ok", {"phash_allow_match": 1.0}, {"match_label": "cat"})], {}, "OK", (0.0, 0.0, 0.0), "pHash allowlist match (cat)"),
+    ("phash block wins", [_ok("pHash blocklist", phash_block_match=1.0), _ok("pHash allowlist", phash_allow_match=1.0)], {}, "BLOCK", (1.0, 1.0, 1.0), "pHash blocklist match"),
+    # OCR hit ends the evaluation even if later engines say otherwise
+    ("ocr hit", [_ok("OCR text", ocr_match=1.0), _ok("OpenNSFW2", nsfw_probability=0.0)], {}, "BLOCK", (1.0, 1.0, 1.0), "OCR text blocked"),
+    ("ocr miss", [_ok("OCR text", ocr_match=0.0)], {}, "OK", (0.0, 0.0, 0.0), None),
+    # Sightengine
+    ("se raw nudity", [_ok("Sightengine", nudity_raw=0.9)], {}, "BLOCK", (0.9, 0.0, 0.0), "Sightengine raw nudity=0.90"),
+    ("se partial nudity", [_ok("Sightengine", nudity_partial=0.8)], {}, "REVIEW", (0.48, 0.0, 0.0), "Sightengine partial nudity=0.80"),
+    ("se partial capped by safe", [_ok("Sightengine", nudity_partial=0.8, nudity_safe=0.9)], {}, "OK", (0.06, 0.0, 0.0), None),
+    ("se offensive", [_ok("Sightengine", offensive_max=0.6)], {}, "BLOCK", (0.0, 0.0, 1.0), "Sightengine offensive symbols: score=0.60"),
+    ("se gore", [_ok("Sightengine", gore_prob=0.25)], {}, "BLOCK", (0.0, 1.0, 0.0), "Sightengine gore/blood: score=0.25 (prob=0.25)"),
+    # OpenAI
+    ("openai sexual", [_ok("OpenAI Moderation", sexual=0.6)], {}, "REVIEW", (0.6, 0.0, 0.0), "OpenAI sexual=0.60"),
+    ("openai hate", [_ok("OpenAI Moderation", **{"hate/threatening": 0.9})], {}, "BLOCK", (0.0, 0.0, 0.9), "OpenAI hate=0.90"),
+    ("openai minors", [_ok("OpenAI Moderation", **{"sexual/minors": 0.02}), _ok("pHash allowlist", phash_allow_match=1.0)], {}, "BLOCK", (1.0, 1.0, 1.0), "OpenAI: sexual/minors detected"),
+    # ENGINE_ERROR_POLICY for a failed core engine next to a clean one
+    ("error review", [EngineResult("OpenAI Moderation", "error", error="boom"), _ok("OpenNSFW2", nsfw_probability=0.0)], {}, "REVIEW", (0.4, 0.4, 0.4), "Some checks failed: OpenAI Moderation"),
+    ("error block", [EngineResult("OpenAI Moderation", "error", error="boom"), _ok("OpenNSFW2", nsfw_probability=0.0)], {"ENGINE_ERROR_POLICY": "block"}, "BLOCK", (0.5, 0.5, 0.5), "Some checks failed: OpenAI Moderation"),
+    ("error ignore", [EngineResult("OpenAI Moderation", "error", error="boom"), _ok("OpenNSFW2", nsfw_probability=0.0)], {"ENGINE_ERROR_POLICY": "ignore"}, "OK", (0.0, 0.0, 0.0), "Some checks failed: OpenAI Moderation"),
+    ("non-core error", [EngineResult("NudeNet", "error", error="boom"), _ok("OpenNSFW2", nsfw_probability=0.0)], {}, "OK", (0.0, 0.0, 0.0), "Non-core checks failed (ignored): NudeNet"),
+    ("nothing ran", [EngineResult("OpenAI Moderation", "skipped", error="no key")], {}, "OK", (0.0, 0.0, 0.0), "No checks ran (all engines skipped/disabled)."),
+    # Out-of-range and junk values on the _b01 path are clamped / defaulted
+    ("b01 above 1", [_ok("OpenNSFW2", nsfw_probability=1.7)], {}, "BLOCK", (1.0, 0.0, 0.0), "OpenNSFW2 NSFW=1.00"),
+    ("b01 negative", [_ok("NudeNet", nudity_exposed=-0.5, nudity_covered=0.2)], {}, "OK", (0.1, 0.0, 0.0), None),
+    ("b01 nan", [_ok("OpenNSFW2", nsfw_probability=float("nan"))], {}, "OK", (0.0, 0.0, 0.0), None),
+    ("b01 string", [_ok("OpenNSFW2", nsfw_probability="0.55")], {}, "REVIEW", (0.55, 0.0, 0.0), "OpenNSFW2 NSFW=0.55"),
+    ("b01 int match", [_ok("pHash blocklist", phash_block_match=1)], {}, "BLOCK", (1.0, 1.0, 1.0), "pHash blocklist match"),
+    # thresholds come from the env
+    ("custom thresholds", [_ok("OpenAI Moderation", sexual=0.6)], {"FINAL_BLOCK_THRESHOLD": "0.5"}, "BLOCK", (0.6, 0.0, 0.0), "OpenAI sexual=0.60"),
+]
+
+
+@pytest.mark.parametrize("results, env, label, risks, reason", [c[1:] for c in _CASES], ids=[c[0] for c in _CASES])
+def test_compute_verdict_cases(monkeypatch, results, env, label, risks, reason) -> None:
+    for k, v in env.items():
+        monkeypatch.setenv(k, v)
+    v = compute_verdict(results)
+    assert v.label == label
+    assert (v.nudity_risk, v.violence_risk, v.hate_risk) == pytest.approx(risks)
+    if reason is None:
+        assert label != "OK" or not any("=" in r for r in v.reasons)
+    else:
+        assert reason in v.reasons
+    if label != "OK":
+        assert v.reasons  # REVIEW/BLOCK always explain themselves